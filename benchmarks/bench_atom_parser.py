@@ -0,0 +1,77 @@
+"""
+Benchmark the arXiv Atom parser against feedparser.
+
+Usage:
+    python benchmarks/bench_atom_parser.py [feed.xml ...]
+
+With no arguments, synthetic arXiv feeds of 100, 1,000 and 10,000 entries
+are generated. Recorded API responses can be passed instead. The
+feedparser column runs the path arxiv.Client takes: `feedparser.parse`
+followed by `arxiv.Result._from_feed_entry` for every entry.
+"""
+
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from arxiv_atom import parse_feed  # noqa: E402
+from arxiv_standin import render_feed, synthetic_corpus  # noqa: E402
+
+try:
+    import arxiv
+    import feedparser
+except ImportError:
+    arxiv = feedparser = None
+
+
+def synthetic_feed(n: int, seed: int = 0) -> bytes:
+    return render_feed(synthetic_corpus(n, seed), total_results=n)
+
+
+def parse_with_feedparser(data: bytes) -> list:
+    feed = feedparser.parse(data)
+    return [arxiv.Result._from_feed_entry(entry) for entry in feed.entries]
+
+
+def measure(fn, data: bytes, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(data)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(result), statistics.median(timings), peak
+
+
+def main(paths: list) -> None:
+    if paths:
+        feeds = [(os.path.basename(path), open(path, "rb").read()) for path in paths]
+    else:
+        feeds = [(f"synthetic-{n}", synthetic_feed(n)) for n in (100, 1000, 10000)]
+
+    parsers = [("arxiv_atom", parse_feed)]
+    if feedparser is not None:
+        parsers.append(("feedparser", parse_with_feedparser))
+    else:
+        print("feedparser/arxiv not installed; benchmarking arxiv_atom only\n")
+
+    print(f"{'feed':<18}{'size':>10}  {'parser':<12}{'entries':>8}{'median':>11}{'peak mem':>12}")
+    for name, data in feeds:
+        repeat = 5 if len(data) < 5_000_000 else 2
+        for parser_name, fn in parsers:
+            count, median, peak = measure(fn, data, repeat)
+            print(
+                f"{name:<18}{len(data) / 1e6:>8.2f}MB  {parser_name:<12}{count:>8}"
+                f"{median * 1000:>9.1f}ms{peak / 1e6:>10.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,82 @@
+"""
+Measure the space paper records take in each store, and what reading them costs.
+
+Usage:
+    python benchmarks/bench_paper_storage.py [corpus]
+
+The corpus is anything arxiv_standin accepts: synthetic:<size> (the
+default, synthetic:5000), a papers/ directory or a JSONL file of records.
+Synthetic abstracts are drawn from a small vocabulary and compress far
+better than real ones, so pass a real corpus for representative ratios.
+
+Each store is filled twice, once plain and once with PAPER_COMPRESSION=zlib,
+in topics of 50 papers. Stored bytes are the record log for the file store
+and the pages of the papers table for SQLite; the ratio compares each
+compressed store with the plain one. Decode time is the mean per paper of
+`get_paper` over every stored ID, which reads and decodes one record.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from arxiv_standin import load_corpus  # noqa: E402
+from paper_store import RECORDS_FILE, FileStore  # noqa: E402
+from sqlite_store import SqliteStore  # noqa: E402
+
+TOPIC_SIZE = 50
+
+
+def open_store(kind: str, root: str, compress: bool):
+    if kind == "files":
+        return FileStore(os.path.join(root, "papers"), index=False, compress=compress)
+    return SqliteStore(os.path.join(root, "papers.sqlite3"), compress=compress)
+
+
+def stored_bytes(kind: str, store) -> int:
+    if kind == "files":
+        return os.path.getsize(os.path.join(store.root, RECORDS_FILE))
+    db = store._reader()
+    return db.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'papers'").fetchone()[0]
+
+
+def run(kind: str, compress: bool, papers: list) -> tuple:
+    with tempfile.TemporaryDirectory() as root:
+        store = open_store(kind, root, compress)
+        start = time.perf_counter()
+        for i in range(0, len(papers), TOPIC_SIZE):
+            store.save_papers(f"topic {i // TOPIC_SIZE}", papers[i:i + TOPIC_SIZE])
+        write_seconds = time.perf_counter() - start
+        size = stored_bytes(kind, store)
+
+        start = time.perf_counter()
+        for paper in papers:
+            if store.get_paper(paper.id) is None:
+                raise RuntimeError(f"{paper.id} was not stored")
+        decode_seconds = time.perf_counter() - start
+        store.close()
+    return size, write_seconds, decode_seconds
+
+
+def main(spec: str) -> None:
+    papers = load_corpus(spec)
+    summary_bytes = sum(len(paper.summary.encode()) for paper in papers)
+    print(f"{len(papers)} papers from {spec}, {summary_bytes / len(papers):.0f} summary bytes per paper")
+    print(f"{'store':<8} {'records':<8} {'stored KiB':>11} {'ratio':>6} {'write us':>9} {'decode us':>10}")
+    for kind in ("files", "sqlite"):
+        plain = None
+        for compress in (False, True):
+            size, write_seconds, decode_seconds = run(kind, compress, papers)
+            plain = plain or size
+            print(
+                f"{kind:<8} {'zlib' if compress else 'plain':<8} {size / 1024:>11.0f}"
+                f" {plain / size:>6.2f} {write_seconds / len(papers) * 1e6:>9.1f}"
+                f" {decode_seconds / len(papers) * 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "synthetic:5000")
@@ -0,0 +1,115 @@
+"""
+Stress concurrent paper writes and check that none are lost.
+
+Usage:
+    python benchmarks/stress_paper_writes.py [writers] [saves per writer]
+
+Writers store their own papers across a handful of shared topics, so
+saves to the same topic race each other, while readers load those topics
+the whole time. Each store runs twice: every save straight to the store
+from a worker thread, and through GroupCommit as the server does. Every
+paper is then read back; a missing or stale record, or a read that found
+a topic unreadable, makes the script exit non-zero.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from arxiv_atom import Paper  # noqa: E402
+from group_commit import GroupCommit  # noqa: E402
+from paper_store import FileStore  # noqa: E402
+from sqlite_store import SqliteStore  # noqa: E402
+
+TOPICS = [f"stress topic {n}" for n in range(4)]
+BATCH = 5
+
+
+def make_paper(writer: int, save: int, k: int) -> Paper:
+    return Paper(
+        id=f"{2400 + writer:04d}.{save * BATCH + k:05d}v1",
+        title=f"Writer {writer} save {save} paper {k}",
+        authors=[f"Writer {writer}"],
+        summary="Stress test abstract. " * 40,
+        pdf_url=f"http://arxiv.org/pdf/{2400 + writer:04d}.{save * BATCH + k:05d}v1",
+        published="2024-01-01T00:00:00Z",
+        updated=f"2024-01-01T00:{save % 60:02d}:00Z",
+    )
+
+
+async def run(store, grouped: bool, writers: int, saves: int) -> tuple:
+    commit = GroupCommit(store.save_papers) if grouped else None
+    expected = {topic: {} for topic in TOPICS}
+    unreadable = 0
+    done = False
+
+    async def writer(w: int) -> None:
+        for i in range(saves):
+            topic = TOPICS[(w + i) % len(TOPICS)]
+            papers = [make_paper(w, i, k) for k in range(BATCH)]
+            if commit is not None:
+                await commit.save(topic, papers)
+            else:
+                await asyncio.to_thread(store.save_papers, topic, papers)
+            for paper in papers:
+                expected[topic][paper.id] = paper.title
+
+    async def reader() -> None:
+        nonlocal unreadable
+        while not done:
+            for topic in TOPICS:
+                if expected[topic] and await asyncio.to_thread(store.load_topic, topic) is None:
+                    unreadable += 1
+            await asyncio.sleep(0)
+
+    readers = [asyncio.create_task(reader()) for _ in range(4)]
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(w) for w in range(writers)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await asyncio.gather(*readers)
+
+    lost = 0
+    for topic, papers in expected.items():
+        stored = store.load_topic(topic) or {}
+        for paper_id, title in papers.items():
+            if stored.get(paper_id, {}).get('title') != title:
+                lost += 1
+    writes = commit.stats()['writes'] if commit is not None else writers * saves
+    return elapsed, writes, lost, unreadable
+
+
+def open_store(kind: str, root: str):
+    if kind == "files":
+        return FileStore(os.path.join(root, "papers"))
+    return SqliteStore(os.path.join(root, "papers.sqlite3"))
+
+
+def main(writers: int, saves: int) -> int:
+    failures = 0
+    total = writers * saves
+    print(f"{writers} writers x {saves} saves of {BATCH} papers over {len(TOPICS)} topics")
+    print(f"{'store':<8} {'mode':<13} {'saves/s':>9} {'papers/s':>9} {'writes':>7} {'lost':>5} {'unreadable':>10}")
+    for kind in ("files", "sqlite"):
+        for grouped in (False, True):
+            with tempfile.TemporaryDirectory() as root:
+                store = open_store(kind, root)
+                elapsed, writes, lost, unreadable = asyncio.run(run(store, grouped, writers, saves))
+                store.close()
+            failures += lost + unreadable
+            mode = "group commit" if grouped else "direct"
+            print(
+                f"{kind:<8} {mode:<13} {total / elapsed:>9.0f} {total * BATCH / elapsed:>9.0f}"
+                f" {writes:>7} {lost:>5} {unreadable:>10}"
+            )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    saves = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    sys.exit(main(writers, saves))
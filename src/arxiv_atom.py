@@ -0,0 +1,125 @@
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import List, Optional
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass(slots=True)
+class Paper:
+    """The subset of an arXiv result that the research server stores."""
+
+    id: str
+    title: str
+    authors: List[str]
+    summary: str
+    pdf_url: Optional[str]
+    published: str
+    updated: str
+
+    def to_info(self) -> dict:
+        """Return the record as it is stored in papers_info.json."""
+        return {
+            'title': self.title,
+            'authors': self.authors,
+            'summary': self.summary,
+            'pdf_url': self.pdf_url,
+            'published': self.published[:10]
+        }
+
+
+class AtomParseError(Exception):
+    """Raised when a response is not a usable arXiv Atom feed."""
+
+
+class ArxivQueryError(AtomParseError):
+    """Raised when arXiv answers with an error entry, e.g. for a bad query."""
+
+
+class AtomFeedParser:
+    """
+    Incremental parser for arXiv API Atom feeds.
+
+    Bytes can be fed as they arrive from the network; each call returns the
+    entries completed so far as `Paper` records. Finished entries are
+    dropped from the element tree straight away, so memory use depends on
+    the chunk size rather than the feed size.
+    """
+
+    def __init__(self):
+        self.total_results: Optional[int] = None
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+
+    def feed(self, data: bytes) -> List[Paper]:
+        try:
+            self._parser.feed(data)
+        except ET.ParseError as e:
+            raise AtomParseError(f"Malformed Atom feed: {e}") from e
+        return self._drain()
+
+    def close(self) -> List[Paper]:
+        try:
+            self._parser.close()
+        except ET.ParseError as e:
+            raise AtomParseError(f"Malformed Atom feed: {e}") from e
+        papers = self._drain()
+        if self._root is None or self._root.tag != ATOM + "feed":
+            raise AtomParseError("Response is not an Atom feed")
+        return papers
+
+    def _drain(self) -> List[Paper]:
+        papers = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                continue
+            if elem.tag == ATOM + "entry":
+                papers.append(_paper_from_entry(elem))
+                # Entries are direct children of the feed element.
+                self._root.clear()
+            elif elem.tag == OPENSEARCH + "totalResults":
+                self.total_results = int(elem.text or 0)
+        return papers
+
+
+def parse_feed(data: bytes, chunk_size: int = 64 * 1024) -> List[Paper]:
+    """Parse a complete feed document and return its papers."""
+    parser = AtomFeedParser()
+    papers = []
+    # Feeding in chunks lets finished entries be freed as parsing goes.
+    for start in range(0, len(data), chunk_size):
+        papers.extend(parser.feed(data[start:start + chunk_size]))
+    papers.extend(parser.close())
+    return papers
+
+
+def _paper_from_entry(entry: ET.Element) -> Paper:
+    entry_id = entry.findtext(ATOM + "id", "")
+    if "/api/errors" in entry_id:
+        raise ArxivQueryError(f"arXiv API error: {entry.findtext(ATOM + 'summary', '').strip()}")
+
+    pdf_url = None
+    for link in entry.iterfind(ATOM + "link"):
+        if link.get("title") == "pdf":
+            pdf_url = link.get("href")
+            break
+
+    return Paper(
+        id=entry_id.split("arxiv.org/abs/")[-1],
+        # Titles are line-wrapped in the feed.
+        title=_WHITESPACE.sub(" ", entry.findtext(ATOM + "title", "0")).strip(),
+        authors=[
+            name.text or ""
+            for name in entry.iterfind(f"{ATOM}author/{ATOM}name")
+        ],
+        summary=(entry.findtext(ATOM + "summary") or "").strip(),
+        pdf_url=pdf_url,
+        published=entry.findtext(ATOM + "published", ""),
+        updated=entry.findtext(ATOM + "updated", ""),
+    )
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import re
+import time
+from typing import AsyncIterator, List, Optional
+from urllib.parse import urlencode
+
+import httpx
+
+import config
+from arxiv_atom import ArxivQueryError, AtomFeedParser, AtomParseError, Paper
+from circuit_breaker import CircuitBreaker
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "remote-research-server/0.1.0"
+
+# New-style (2107.05580v1) and pre-2007 (quant-ph/0201082v1) identifiers.
+_ARXIV_ID = re.compile(
+    r"^(\d{4}\.\d{4,5}|[a-z]+(-[a-z]+)*(\.[A-Z]{2})?/\d{7})(v\d+)?$"
+)
+
+
+def is_valid_arxiv_id(paper_id: str) -> bool:
+    """Whether arXiv would accept `paper_id` in an id_list lookup."""
+    return bool(_ARXIV_ID.match(paper_id))
+
+
+class ArxivFetchError(Exception):
+    """Raised when the arXiv API keeps failing after all retries."""
+
+
+class RequestClock:
+    """
+    Time how long a search has spent waiting on arXiv itself.
+
+    The fetcher starts the clock when a request leaves, after any wait for
+    the rate limiter, and stops it once the response has been read, so time
+    spent queued behind other requests is never counted. Time adds up
+    across the pages and retries of one search.
+    """
+
+    def __init__(self):
+        self._waited = 0.0
+        self._sent_at: Optional[float] = None
+
+    def sent(self) -> None:
+        self._sent_at = time.monotonic()
+
+    def answered(self) -> None:
+        sent_at, self._sent_at = self._sent_at, None
+        if sent_at is not None:
+            self._waited += time.monotonic() - sent_at
+
+    def waited(self) -> float:
+        """Seconds spent waiting on arXiv so far, including any request in flight."""
+        sent_at = self._sent_at
+        return self._waited + (0.0 if sent_at is None else time.monotonic() - sent_at)
+
+
+class ArxivFetcher:
+    """
+    Non-blocking client for the arXiv query API.
+
+    Mirrors the paging and retry behaviour of `arxiv.Client`, but every
+    request goes through a pooled `httpx.AsyncClient` and every wait is a
+    coroutine, so a slow search never stalls the event loop that serves the
+    other MCP sessions. One fetcher is meant to live for the whole process;
+    the `TokenBucket` it is given paces all of its requests, retries
+    included, and the `CircuitBreaker` fails requests fast while arXiv is
+    down instead of letting them queue behind retries.
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        api_url: str = config.ARXIV_API_URL,
+        page_size: int = config.ARXIV_MAX_PAGE_SIZE,
+        num_retries: int = config.ARXIV_NUM_RETRIES,
+        timeout: float = config.ARXIV_TIMEOUT,
+        max_connections: int = config.ARXIV_MAX_CONNECTIONS,
+    ):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.api_url = api_url
+        self.page_size = page_size
+        self.num_retries = num_retries
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            headers={"user-agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def __aenter__(self) -> "ArxivFetcher":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def search(
+        self,
+        query: str,
+        max_results: int,
+        sort_by: str = "relevance",
+        sort_order: str = "descending",
+        background: bool = False,
+    ) -> List[Paper]:
+        """Return up to `max_results` papers matching `query`."""
+        papers = []
+        async for page in self.pages(
+            query, max_results, sort_by=sort_by, sort_order=sort_order,
+            background=background,
+        ):
+            papers.extend(page)
+        return papers
+
+    async def fetch_ids(self, paper_ids: List[str]) -> List[Paper]:
+        """
+        Return the papers with the given IDs, looked up with arXiv's id_list.
+
+        The IDs travel in a POST body rather than the URL, so up to
+        `page_size` of them cost a single request.
+        """
+        papers = []
+        async for page in self.pages("", len(paper_ids), id_list=paper_ids):
+            papers.extend(page)
+        return papers
+
+    async def pages(
+        self,
+        query: str,
+        max_results: int,
+        sort_by: str = "relevance",
+        sort_order: str = "descending",
+        id_list: Optional[List[str]] = None,
+        page_size: Optional[int] = None,
+        background: bool = False,
+        clock: Optional[RequestClock] = None,
+    ) -> AsyncIterator[List[Paper]]:
+        """
+        Yield the papers matching `query` one API page at a time.
+
+        Pages are sized to the remaining demand, capped at `page_size`
+        (the fetcher's own cap by default), so a five-result search
+        downloads five entries rather than a full page. Only the current
+        page is held in memory, and a caller that stops iterating early
+        stops further requests. A `clock`, if given, is running while a
+        request is with arXiv.
+        """
+        page_cap = min(page_size or self.page_size, self.page_size)
+        args = {
+            "search_query": query,
+            "id_list": ",".join(id_list or []),
+            "sortBy": sort_by,
+            "sortOrder": sort_order,
+        }
+        offset = 0
+        first_page = True
+        while offset < max_results:
+            page, total_results = await self._fetch_page(
+                {**args, "start": offset, "max_results": min(page_cap, max_results - offset)},
+                first_page=first_page,
+                background=background,
+                clock=clock,
+            )
+            if not page:
+                return
+            offset += len(page)
+            yield page
+            if offset >= total_results:
+                return
+            first_page = False
+
+    async def _fetch_page(
+        self,
+        args: dict,
+        first_page: bool,
+        background: bool = False,
+        clock: Optional[RequestClock] = None,
+    ) -> tuple:
+        if args["id_list"]:
+            # Long ID lists would overflow the URL; the API also takes POST.
+            request = self._client.build_request("POST", self.api_url, data=args)
+        else:
+            request = self._client.build_request("GET", self.api_url, params=args)
+        url = f"{self.api_url}?{urlencode(args)}"
+        for try_index in range(self.num_retries + 1):
+            try:
+                return await self._try_fetch_page(request, url, first_page, background, clock)
+            except ArxivQueryError as err:
+                raise ArxivFetchError(str(err)) from err
+            except (ArxivFetchError, AtomParseError, httpx.TransportError) as err:
+                if try_index == self.num_retries:
+                    raise ArxivFetchError(
+                        f"Giving up on {url} after {try_index + 1} tries: {err}"
+                    ) from err
+                logger.debug("Got error (try %d): %s", try_index, err)
+
+    async def _try_fetch_page(
+        self,
+        request: httpx.Request,
+        url: str,
+        first_page: bool,
+        background: bool,
+        clock: Optional[RequestClock],
+    ) -> tuple:
+        # Both raise CircuitOpenError, which is deliberately not retried.
+        # Failing fast keeps callers from queueing for a token while the
+        # circuit is open; checking again once the token is in hand keeps
+        # requests that were already queued from going out after it opened.
+        self.breaker.reject_if_open()
+        await self.limiter.acquire(background=background)
+        self.breaker.check()
+        try:
+            result = await self._request_page(request, url, first_page, clock)
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except ArxivQueryError:
+            # arXiv answered; the query itself was bad.
+            self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _request_page(
+        self,
+        request: httpx.Request,
+        url: str,
+        first_page: bool,
+        clock: Optional[RequestClock],
+    ) -> tuple:
+        logger.info("Requesting page (first: %r): %s", first_page, url)
+        parser = AtomFeedParser()
+        papers = []
+        if clock is not None:
+            clock.sent()
+        try:
+            resp = await self._client.send(request, stream=True)
+            try:
+                if resp.status_code >= 500:
+                    raise ArxivFetchError(f"HTTP {resp.status_code} from {url}")
+                if resp.status_code != httpx.codes.OK:
+                    # Not arXiv failing but the request being refused, so it
+                    # is neither retried nor held against the circuit. arXiv
+                    # explains a bad query in an error entry.
+                    try:
+                        parser.feed(await resp.aread())
+                        parser.close()
+                    except ArxivQueryError:
+                        raise
+                    except AtomParseError:
+                        pass
+                    raise ArxivQueryError(f"HTTP {resp.status_code} from {url}")
+                # Parse while the body is still arriving.
+                async for chunk in resp.aiter_bytes():
+                    papers.extend(parser.feed(chunk))
+            finally:
+                await resp.aclose()
+        finally:
+            if clock is not None:
+                clock.answered()
+        papers.extend(parser.close())
+
+        if not papers and not first_page:
+            raise ArxivFetchError(f"Unexpected empty page from {url}")
+        return papers, parser.total_results or 0
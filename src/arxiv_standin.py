@@ -0,0 +1,389 @@
+"""
+Local stand-in for the arXiv query API, for offline benchmarks and load tests.
+
+Serves Atom feeds from a synthetic or recorded corpus at /api/query, taking
+the same parameters as export.arxiv.org (search_query, id_list, start,
+max_results, sortBy, sortOrder) over GET or POST. Latency, random errors
+and bursts of 503s are configurable and seeded, so runs are repeatable.
+
+Run it and point the research server at it:
+
+    python src/arxiv_standin.py --port 8090 --corpus synthetic:20000 --latency-ms 300
+    ARXIV_API_URL=http://127.0.0.1:8090/api/query ARXIV_RATE_LIMIT=100 \\
+        python src/research_server.py
+
+`--corpus` also accepts a papers/ directory written by the research server,
+with either paper store, or a JSON Lines file with one {"id", "title",
+"authors", "summary", "published", "updated"} record per line.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+from arxiv_atom import Paper
+from paper_store import FileStore
+from record_codec import Codec
+
+# The database a research server with PAPER_STORE=sqlite keeps in papers/.
+PAPER_DB_FILE = "papers.sqlite3"
+
+_WORDS = (
+    "language model transformer attention graph neural network learning "
+    "reinforcement policy gradient diffusion sampling quantum circuit "
+    "optimization convex bound theorem dataset benchmark evaluation robust "
+    "adversarial retrieval augmented generation protein structure causal "
+    "inference bayesian variational kernel sparse federated privacy vision "
+    "segmentation speech translation reasoning planning agent memory"
+).split()
+
+_NAMES = (
+    "Ana García", "Björn Åström", "Chen Wei", "Dmitri Ivanov", "Élodie Durand",
+    "Fatima Zahra", "Giulia Rossi", "Hiroshi Tanaka", "Ingrid Nørgaard",
+    "José Martínez", "Kwame Mensah", "Léa Müller", "Mohammed Al-Sayed",
+    "Nikolaj Søndergaard", "Olga Petrova", "Priya Sharma", "Rafael Souza",
+    "Siobhán Ní Bhriain", "Tomás Novák", "Zoë Schröder",
+)
+
+_TERM = re.compile(r'(?:(ti|au|abs|all|cat|id):)?("[^"]*"|\S+)')
+_ID = re.compile(r"^(\d{4}\.\d{4,5}|[a-z]+(-[a-z]+)*(\.[A-Z]{2})?/\d{7})(v\d+)?$")
+
+
+def synthetic_corpus(size: int, seed: int = 0) -> List[Paper]:
+    """Generate `size` reproducible arXiv-like papers, oldest first."""
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=3650) / max(size, 1)
+    papers = []
+    for i in range(size):
+        published = start + step * i + timedelta(seconds=rng.randint(0, 3600))
+        updated = published + timedelta(days=rng.choice((0, 0, 0, 7, 60)))
+        short_id = f"{published:%y%m}.{i % 100000:05d}v{rng.randint(1, 3)}"
+        papers.append(Paper(
+            id=short_id,
+            title=" ".join(rng.choices(_WORDS, k=rng.randint(6, 14))).title(),
+            authors=rng.sample(_NAMES, rng.randint(1, 6)),
+            summary=" ".join(rng.choices(_WORDS, k=rng.randint(120, 220))).capitalize() + ".",
+            pdf_url=f"http://arxiv.org/pdf/{short_id}",
+            published=published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            updated=updated.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        ))
+    return papers
+
+
+def load_corpus(spec: str, seed: int = 0) -> List[Paper]:
+    """Load a corpus from `synthetic:<size>`, a papers/ directory or a JSONL file."""
+    if spec.startswith("synthetic:"):
+        return synthetic_corpus(int(spec.split(":", 1)[1]), seed)
+    if os.path.isdir(spec):
+        return list(_papers_from_directory(spec))
+    with open(spec, "r") as corpus_file:
+        return [_paper_from_record(json.loads(line)) for line in corpus_file if line.strip()]
+
+
+def _papers_from_directory(paper_dir: str) -> Iterable[Paper]:
+    """Read the papers a research server stored, from either store, without changing them."""
+    seen = set()
+    db_path = os.path.join(paper_dir, PAPER_DB_FILE)
+    if os.path.isfile(db_path):
+        for record in _records_from_database(db_path):
+            if record["id"] not in seen:
+                seen.add(record["id"])
+                yield _paper_from_record(record)
+    files = FileStore(paper_dir, read_only=True)
+    try:
+        for _, papers_info, _ in files.read_topics():
+            for paper_id, info in papers_info.items():
+                if paper_id not in seen:
+                    seen.add(paper_id)
+                    yield _paper_from_record({"id": paper_id, **info})
+    finally:
+        files.close()
+
+
+def _records_from_database(db_path: str) -> Iterable[dict]:
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    def load_zdict(dict_id: int) -> Optional[bytes]:
+        row = db.execute("SELECT data FROM zdicts WHERE id = ?", (dict_id,)).fetchone()
+        return row[0] if row else None
+
+    codec = Codec(load_zdict)
+    try:
+        rows = db.execute(
+            "SELECT id, title, authors, summary, pdf_url, published, updated FROM papers"
+        ).fetchall()
+        for paper_id, title, authors, summary, pdf_url, published, updated in rows:
+            yield {
+                "id": paper_id,
+                "title": title,
+                "authors": json.loads(authors),
+                "summary": codec.decompress(summary) if isinstance(summary, bytes) else summary,
+                "pdf_url": pdf_url,
+                "published": published,
+                "updated": updated,
+            }
+    finally:
+        db.close()
+
+
+def _paper_from_record(record: dict) -> Paper:
+    published = record["published"]
+    if len(published) == 10:
+        published += "T00:00:00Z"
+    return Paper(
+        id=record["id"],
+        title=record["title"],
+        authors=list(record["authors"]),
+        summary=record["summary"],
+        pdf_url=record.get("pdf_url") or f"http://arxiv.org/pdf/{record['id']}",
+        published=published,
+        updated=record.get("updated") or published,
+    )
+
+
+def render_feed(papers: List[Paper], total_results: int, start: int = 0, query: str = "") -> bytes:
+    """Render papers as an arXiv API Atom feed."""
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        f'  <title type="html">ArXiv Query: {escape(query)}</title>\n'
+        '  <id>http://arxiv.org/api/standin</id>\n'
+        f'  <updated>{datetime.now(timezone.utc):%Y-%m-%dT%H:%M:%SZ}</updated>\n'
+        '  <opensearch:totalResults xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f'{total_results}</opensearch:totalResults>\n'
+        '  <opensearch:startIndex xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f'{start}</opensearch:startIndex>\n'
+        '  <opensearch:itemsPerPage xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f'{len(papers)}</opensearch:itemsPerPage>\n'
+    ]
+    for paper in papers:
+        authors = "".join(
+            f"    <author>\n      <name>{escape(name)}</name>\n    </author>\n"
+            for name in paper.authors
+        )
+        parts.append(
+            "  <entry>\n"
+            f"    <id>http://arxiv.org/abs/{paper.id}</id>\n"
+            f"    <updated>{paper.updated}</updated>\n"
+            f"    <published>{paper.published}</published>\n"
+            f"    <title>{escape(paper.title)}</title>\n"
+            f"    <summary>  {escape(paper.summary)}\n</summary>\n"
+            f"{authors}"
+            f'    <link href="http://arxiv.org/abs/{paper.id}" rel="alternate" type="text/html"/>\n'
+            f'    <link title="pdf" href={quoteattr(paper.pdf_url or "")} rel="related" type="application/pdf"/>\n'
+            '    <arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" '
+            'term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>\n'
+            '    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>\n'
+            "  </entry>\n"
+        )
+    parts.append("</feed>\n")
+    return "".join(parts).encode()
+
+
+def render_error(message: str) -> bytes:
+    """Render the single-entry error feed arXiv returns for bad requests."""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        '  <opensearch:totalResults xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">1'
+        '</opensearch:totalResults>\n'
+        '  <entry>\n'
+        '    <id>http://arxiv.org/api/errors#standin</id>\n'
+        '    <title>Error</title>\n'
+        f'    <summary>{escape(message)}</summary>\n'
+        '  </entry>\n'
+        '</feed>\n'
+    ).encode()
+
+
+class ArxivStandIn:
+    """The query engine and fault injection behind the stand-in HTTP server."""
+
+    def __init__(
+        self,
+        corpus: List[Paper],
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        burst_every: int = 0,
+        burst_length: int = 0,
+        seed: int = 0,
+    ):
+        self.corpus = corpus
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self._by_id = {}
+        for paper in corpus:
+            self._by_id[paper.id] = paper
+            self._by_id.setdefault(_base_id(paper.id), paper)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def handle(self, params: dict) -> tuple:
+        """Answer one API call; returns (status, body)."""
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms))
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay / 1000)
+
+        if self.burst_every and (n - 1) % self.burst_every < self.burst_length:
+            return 503, b"Service Unavailable"
+        if fail:
+            return 503, b"Service Unavailable"
+
+        query = params.get("search_query", "")
+        ids = [i for i in params.get("id_list", "").split(",") if i]
+        try:
+            start = int(params.get("start", 0))
+            max_results = int(params.get("max_results", 10))
+        except ValueError:
+            return 400, render_error("start and max_results must be integers")
+        if max_results > 30000:
+            return 400, render_error("max_results must be at most 30000")
+
+        for paper_id in ids:
+            if not _ID.match(paper_id):
+                return 400, render_error(f"incorrect id format for {paper_id}")
+
+        matches = self.search(query, ids, params.get("sortBy", "relevance"), params.get("sortOrder", "descending"))
+        page = matches[start:start + max_results]
+        return 200, render_feed(page, len(matches), start, query)
+
+    def search(self, query: str, ids: List[str], sort_by: str, sort_order: str) -> List[Paper]:
+        if ids:
+            candidates = [self._by_id[i] for i in ids if i in self._by_id]
+        else:
+            candidates = self.corpus
+        if not query:
+            return candidates if ids else []
+
+        terms = [(field or "all", value.strip('"').lower()) for field, value in _TERM.findall(query)]
+        terms = [(field, value) for field, value in terms if value not in ("and", "or", "andnot")]
+        scored = []
+        for paper in candidates:
+            score = _score(paper, terms)
+            if score:
+                scored.append((score, paper))
+
+        descending = sort_order != "ascending"
+        if sort_by == "submittedDate":
+            scored.sort(key=lambda item: item[1].published, reverse=descending)
+        elif sort_by == "lastUpdatedDate":
+            scored.sort(key=lambda item: item[1].updated, reverse=descending)
+        else:
+            scored.sort(key=lambda item: item[0], reverse=descending)
+        return [paper for _, paper in scored]
+
+
+def _score(paper: Paper, terms: List[tuple]) -> int:
+    """Count term hits; every term must hit at least once."""
+    fields = {
+        "ti": paper.title.lower(),
+        "abs": paper.summary.lower(),
+        "au": " ".join(paper.authors).lower(),
+        "id": paper.id,
+        "cat": "cs.lg",
+    }
+    fields["all"] = " ".join((fields["ti"], fields["abs"], fields["au"]))
+    score = 0
+    for field, value in terms:
+        hits = fields[field].count(value)
+        if not hits:
+            return 0
+        score += hits
+    return score
+
+
+def _base_id(paper_id: str) -> str:
+    return re.sub(r"v\d+$", "", paper_id)
+
+
+def make_server(standin: ArxivStandIn, host: str = "127.0.0.1", port: int = 8090) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            self._answer(url.path, url.query)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode()
+            self._answer(url.path, "&".join(filter(None, (url.query, body))))
+
+        def _answer(self, path: str, query_string: str):
+            if path != "/api/query":
+                status, body = 404, b"Not Found"
+            else:
+                params = {k: v[-1] for k, v in parse_qs(query_string).items()}
+                status, body = standin.handle(params)
+            self.send_response(status)
+            self.send_header(
+                "Content-Type",
+                "application/atom+xml; charset=utf-8" if body.startswith(b"<?xml") else "text/plain",
+            )
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--corpus", default="synthetic:10000",
+                        help="synthetic:<size>, a papers/ directory or a JSONL file")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 503")
+    parser.add_argument("--burst-every", type=int, default=0,
+                        help="start a burst of 503s every N requests")
+    parser.add_argument("--burst-length", type=int, default=0,
+                        help="number of consecutive 503s per burst")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    standin = ArxivStandIn(
+        load_corpus(args.corpus, args.seed),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        seed=args.seed,
+    )
+    server = make_server(standin, args.host, args.port)
+    print(f"arXiv stand-in serving {len(standin.corpus)} papers at "
+          f"http://{args.host}:{args.port}/api/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
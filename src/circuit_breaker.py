@@ -0,0 +1,93 @@
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Upstream circuit is open; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    every call is refused for `reset_timeout` seconds. Then one probe call
+    is let through (half-open): success closes the circuit, failure opens
+    it for another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._trips = 0
+        self._rejected = 0
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead now."""
+        if self.state == self.OPEN and self.retry_after() == 0:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        if self.state != self.CLOSED:
+            self._rejected += 1
+            raise CircuitOpenError(self.retry_after())
+
+    def reject_if_open(self) -> None:
+        """
+        Raise CircuitOpenError if the circuit is open and not yet due a probe.
+
+        Unlike `check`, this never claims the probe, so callers can fail
+        fast before queueing and still `check` once they are ready to call.
+        """
+        if self.state == self.OPEN and self.retry_after() > 0:
+            self._rejected += 1
+            raise CircuitOpenError(self.retry_after())
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit will let a probe through."""
+        if self.state == self.CLOSED:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.OPEN:
+            # A call sent before the circuit opened; it must not push the
+            # probe further back.
+            return
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._trips += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def abandon(self) -> None:
+        """Forget a call that was cancelled before it could succeed or fail."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'retry_after_seconds': round(self.retry_after(), 1),
+            'trips': self._trips,
+            'rejected': self._rejected,
+        }
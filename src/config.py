@@ -0,0 +1,79 @@
+"""Runtime settings for the research server, read from the environment."""
+
+import os
+
+PAPER_DIR = os.getenv("PAPER_DIR", "papers")
+
+# "sqlite" keeps every paper in one database at PAPER_DB_PATH; "files" keeps
+# a shared record log and a directory per topic under PAPER_DIR. Topics found
+# under PAPER_DIR are imported into the database the first time it is opened.
+PAPER_STORE = os.getenv("PAPER_STORE", "sqlite")
+PAPER_DB_PATH = os.getenv("PAPER_DB_PATH", os.path.join(PAPER_DIR, "papers.sqlite3"))
+# The file store rewrites its record log once superseded records take up
+# more than PAPER_LOG_COMPACT_BYTES and more than PAPER_LOG_COMPACT_GARBAGE
+# of it. The check runs every PAPER_COMPACT_INTERVAL seconds.
+PAPER_LOG_COMPACT_BYTES = int(os.getenv("PAPER_LOG_COMPACT_BYTES", str(1024**2)))
+PAPER_LOG_COMPACT_GARBAGE = float(os.getenv("PAPER_LOG_COMPACT_GARBAGE", "0.5"))
+PAPER_COMPACT_INTERVAL = float(os.getenv("PAPER_COMPACT_INTERVAL", "30"))
+# "zlib" stores new paper records deflated, with a dictionary trained on
+# the stored abstracts; "none" stores them as plain text. Either store reads
+# both, so the setting can change at any time.
+PAPER_COMPRESSION = os.getenv("PAPER_COMPRESSION", "none")
+# Parsed topics the file store keeps in memory, by size on disk.
+TOPIC_CACHE_MAX_BYTES = int(os.getenv("TOPIC_CACHE_MAX_BYTES", str(256 * 1024**2)))
+# Memory-mapped snapshot that extract_info and papers://{topic} read from.
+# Topics written since the last rebuild are read from the store; rebuilds
+# run every SNAPSHOT_INTERVAL seconds, 0 disables the snapshot.
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(PAPER_DIR, "papers.snapshot"))
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "10"))
+# Saves to the same topic that arrive within this many seconds of each
+# other are merged into a single write.
+GROUP_COMMIT_WINDOW = float(os.getenv("GROUP_COMMIT_WINDOW", "0.005"))
+
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query")
+
+# arXiv's terms of use ask for no more than one request every three seconds,
+# across everything this process sends.
+ARXIV_RATE_LIMIT = float(os.getenv("ARXIV_RATE_LIMIT", str(1 / 3)))
+ARXIV_RATE_BURST = int(os.getenv("ARXIV_RATE_BURST", "1"))
+
+# Upper bound on entries per API request; smaller searches ask for exactly
+# what they need. The API itself refuses pages larger than 2000.
+ARXIV_MAX_PAGE_SIZE = min(int(os.getenv("ARXIV_MAX_PAGE_SIZE", "1000")), 2000)
+
+# Incremental refreshes page in small steps, since they usually stop after
+# the first page.
+REFRESH_PAGE_SIZE = int(os.getenv("REFRESH_PAGE_SIZE", "25"))
+
+ARXIV_MAX_CONNECTIONS = int(os.getenv("ARXIV_MAX_CONNECTIONS", "4"))
+ARXIV_TIMEOUT = float(os.getenv("ARXIV_TIMEOUT", "30"))
+ARXIV_NUM_RETRIES = int(os.getenv("ARXIV_NUM_RETRIES", "3"))
+
+# After this many consecutive failed requests, stop calling arXiv for
+# BREAKER_RESET_TIMEOUT seconds and serve stored results instead.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+# How long search_papers waits for arXiv before falling back to stored
+# results. Only time with arXiv counts, not waits for the rate limiter, and
+# topics with nothing stored keep waiting. The fetch itself carries on in
+# the background.
+ARXIV_DEADLINE = float(os.getenv("ARXIV_DEADLINE", "10"))
+
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", os.path.join(".cache", "query_cache.sqlite3"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+QUERY_CACHE_L1_SIZE = int(os.getenv("QUERY_CACHE_L1_SIZE", "1024"))
+QUERY_CACHE_L2_SIZE = int(os.getenv("QUERY_CACHE_L2_SIZE", "100000"))
+
+PDF_DIR = os.getenv("PDF_DIR", "pdfs")
+PDF_STORE_MAX_BYTES = int(os.getenv("PDF_STORE_MAX_BYTES", str(2 * 1024**3)))
+PDF_CONCURRENCY = int(os.getenv("PDF_CONCURRENCY", "4"))
+
+SEARCH_HISTORY_PATH = os.getenv("SEARCH_HISTORY_PATH", os.path.join(".cache", "search_history.json"))
+# The prefetcher wakes every PREFETCH_INTERVAL seconds and, once no user
+# search has touched arXiv for PREFETCH_IDLE_SECONDS, refreshes up to
+# PREFETCH_TOPICS of the top searches whose cached results expire within
+# PREFETCH_MARGIN seconds. Set PREFETCH_TOPICS to 0 to disable it.
+PREFETCH_TOPICS = int(os.getenv("PREFETCH_TOPICS", "50"))
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "60"))
+PREFETCH_IDLE_SECONDS = float(os.getenv("PREFETCH_IDLE_SECONDS", "30"))
+PREFETCH_MARGIN = float(os.getenv("PREFETCH_MARGIN", "900"))
@@ -0,0 +1,79 @@
+import asyncio
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from arxiv_atom import Paper
+from paper_store import topic_dir_name
+
+
+class GroupCommit:
+    """
+    Serialize writes per topic and merge the ones that arrive together.
+
+    Each topic has an `asyncio.Lock`, so only one write per topic runs at a
+    time. Saves that arrive within `window` seconds of each other, or while
+    the topic's previous write is still running, are merged into one call
+    to `save`, in arrival order with later records for the same ID winning.
+    Every caller gets the result of the write that included its papers.
+    """
+
+    def __init__(self, save: Callable[[str, List[Paper]], str], window: float = 0.005):
+        self._save = save
+        self.window = window
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[str, List[Tuple[List[Paper], asyncio.Future]]] = {}
+        self._commits: Set[asyncio.Task] = set()
+        self._saves = 0
+        self._writes = 0
+        self._max_batch = 0
+
+    async def save(self, topic: str, papers: Iterable[Paper]) -> str:
+        """Store papers under a topic and return where they were stored."""
+        name = topic_dir_name(topic)
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(name, [])
+        batch.append((list(papers), future))
+        self._saves += 1
+        if len(batch) == 1:
+            # The commit runs as its own task, so a cancelled caller cannot
+            # strand the others in its batch.
+            commit = asyncio.create_task(self._commit(name, topic))
+            self._commits.add(commit)
+            commit.add_done_callback(self._commits.discard)
+        return await asyncio.shield(future)
+
+    async def _commit(self, name: str, topic: str) -> None:
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if self.window:
+                await asyncio.sleep(self.window)
+            batch = self._pending.pop(name)
+            merged = {}
+            for papers, _ in batch:
+                for paper in papers:
+                    merged[paper.id] = paper
+            self._writes += 1
+            self._max_batch = max(self._max_batch, len(batch))
+            try:
+                result = await asyncio.to_thread(self._save, topic, list(merged.values()))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(result)
+
+    async def aclose(self) -> None:
+        """Wait until every write already requested has been stored."""
+        while self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            'saves': self._saves,
+            'writes': self._writes,
+            'mean_batch': round(self._saves / self._writes, 2) if self._writes else 0.0,
+            'max_batch': self._max_batch,
+            'pending_topics': len(self._pending),
+        }
@@ -0,0 +1,262 @@
+"""Query indexes over stored papers, kept in SQLite."""
+
+import heapq
+import re
+import sqlite3
+import threading
+import unicodedata
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Raised whenever an index is added or changes shape; stores re-index every
+# paper they hold the next time they open an index older than this.
+INDEX_VERSION = 3
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+-- Explicit integer keys survive VACUUM, unlike the implicit rowids of
+-- tables keyed by text, so the full-text rows can point at them.
+CREATE TABLE IF NOT EXISTS search_docs (
+    doc INTEGER PRIMARY KEY,
+    paper_id TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5 (
+    title, summary, authors,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+
+-- Normalized author name -> papers, newest first within each author.
+CREATE TABLE IF NOT EXISTS paper_authors (
+    author TEXT NOT NULL,
+    published TEXT NOT NULL,
+    paper_id TEXT NOT NULL,
+    PRIMARY KEY (author, published, paper_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS paper_authors_paper ON paper_authors (paper_id);
+
+-- Every paper by publication date, for range and recency queries.
+CREATE TABLE IF NOT EXISTS paper_dates (
+    published TEXT NOT NULL,
+    paper_id TEXT NOT NULL UNIQUE,
+    PRIMARY KEY (published, paper_id)
+) WITHOUT ROWID;
+"""
+
+# Stay well below SQLite's limit on bound parameters per statement.
+_MAX_PARAMS = 500
+
+# BM25 weights of the title, summary and authors columns.
+_BM25_WEIGHTS = (4.0, 1.0, 2.0)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def match_query(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query that matches papers with every word.
+
+    Each word is quoted, so operators and punctuation in the text are taken
+    literally. Returns None if the text has no words.
+    """
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens)
+
+
+def normalize_author(name: str) -> str:
+    """
+    Fold an author name for lookup: "José  Núñez-Díaz" -> "jose nunez diaz".
+
+    Accents are dropped, case is folded and punctuation becomes spaces, so
+    spellings that differ only in those match each other.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_TOKEN.findall(stripped.casefold()))
+
+
+def index_current(db: sqlite3.Connection) -> bool:
+    """Whether the indexes in `db` have every paper in their current shape."""
+    row = db.execute("SELECT value FROM index_meta WHERE key = 'version'").fetchone()
+    return row is not None and int(row[0]) >= INDEX_VERSION
+
+
+def mark_index_current(db: sqlite3.Connection) -> None:
+    db.execute(
+        "INSERT OR REPLACE INTO index_meta (key, value) VALUES ('version', ?)",
+        (str(INDEX_VERSION),),
+    )
+
+
+def index_papers(db: sqlite3.Connection, records: Iterable[Tuple[str, dict]]) -> None:
+    """Add or replace the index entries of `(paper_id, info)` records."""
+    for paper_id, info in records:
+        db.execute("INSERT OR IGNORE INTO search_docs (paper_id) VALUES (?)", (paper_id,))
+        doc = db.execute(
+            "SELECT doc FROM search_docs WHERE paper_id = ?", (paper_id,)
+        ).fetchone()[0]
+        db.execute("DELETE FROM search_fts WHERE rowid = ?", (doc,))
+        db.execute(
+            "INSERT INTO search_fts (rowid, title, summary, authors) VALUES (?, ?, ?, ?)",
+            (doc, info['title'], info['summary'], "; ".join(info['authors'])),
+        )
+        db.execute("DELETE FROM paper_authors WHERE paper_id = ?", (paper_id,))
+        db.executemany(
+            "INSERT OR IGNORE INTO paper_authors (author, published, paper_id) VALUES (?, ?, ?)",
+            [
+                (author, info['published'], paper_id)
+                for author in {normalize_author(name) for name in info['authors']}
+                if author
+            ],
+        )
+        db.execute(
+            "INSERT OR REPLACE INTO paper_dates (published, paper_id) VALUES (?, ?)",
+            (info['published'], paper_id),
+        )
+
+
+def search(db: sqlite3.Connection, query: str, limit: int) -> List[str]:
+    """Return the IDs of the papers matching `query`, best match first."""
+    fts_query = match_query(query)
+    if fts_query is None or limit <= 0:
+        return []
+    rows = db.execute(
+        "SELECT d.paper_id FROM search_fts"
+        " JOIN search_docs d ON d.doc = search_fts.rowid"
+        " WHERE search_fts MATCH ?"
+        " ORDER BY bm25(search_fts, ?, ?, ?) LIMIT ?",
+        (fts_query, *_BM25_WEIGHTS, limit),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def papers_by_author(db: sqlite3.Connection, name: str, limit: int) -> List[str]:
+    """Return the IDs of the papers by `name`, newest first."""
+    author = normalize_author(name)
+    if not author or limit <= 0:
+        return []
+    # Both keys descending, so SQLite walks the primary key backwards
+    # instead of sorting the author's papers in a temporary B-tree.
+    rows = db.execute(
+        "SELECT paper_id FROM paper_authors WHERE author = ?"
+        " ORDER BY published DESC, paper_id DESC LIMIT ?",
+        (author, limit),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _range_clause(start: Optional[str], end: Optional[str]) -> Tuple[str, list]:
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("d.published >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("d.published < ?")
+        params.append(end)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def papers_by_date(
+    db: sqlite3.Connection, start: Optional[str], end: Optional[str]
+) -> Iterator[str]:
+    """
+    Yield the IDs of the papers published in [start, end), newest first.
+
+    Both bounds are ISO dates and either may be None for an open end. The
+    rows come straight off the index in order, so stopping after n costs
+    n rows whatever the size of the store.
+    """
+    where, params = _range_clause(start, end)
+    cursor = db.execute(
+        f"SELECT d.paper_id FROM paper_dates d{where}"
+        " ORDER BY d.published DESC, d.paper_id DESC",
+        params,
+    )
+    for row in cursor:
+        yield row[0]
+
+
+class PaperIndex:
+    """
+    Indexes for a store that has no database of its own, in a sidecar file.
+
+    The store feeds it every record it writes; `unindexed` tells it which
+    stored papers still need indexing, e.g. ones written before the index
+    existed or before its current version, so it can catch up when opened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._db.executescript(INDEX_SCHEMA)
+
+    def add(self, records: Dict[str, dict]) -> None:
+        with self._lock, self._db as db:
+            index_papers(db, records.items())
+
+    def unindexed(self, paper_ids: Iterable[str]) -> List[str]:
+        """Return the IDs among `paper_ids` whose index entries are missing or outdated."""
+        with self._lock:
+            if not index_current(self._db):
+                return list(paper_ids)
+            indexed = {row[0] for row in self._db.execute("SELECT paper_id FROM search_docs")}
+        return [paper_id for paper_id in paper_ids if paper_id not in indexed]
+
+    def mark_current(self) -> None:
+        with self._lock, self._db as db:
+            mark_index_current(db)
+
+    def search(self, query: str, limit: int) -> List[str]:
+        with self._lock:
+            return search(self._db, query, limit)
+
+    def papers_by_author(self, name: str, limit: int) -> List[str]:
+        with self._lock:
+            return papers_by_author(self._db, name, limit)
+
+    def papers_by_date(
+        self,
+        start: Optional[str],
+        end: Optional[str],
+        limit: int,
+        members: Optional[Iterable[str]] = None,
+    ) -> List[str]:
+        """
+        Return up to `limit` IDs published in [start, end), newest first.
+
+        With `members`, only those papers are considered: their dates are
+        looked up by ID and sorted, so the cost follows the number of
+        members rather than the size of the store.
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            if members is None:
+                return list(islice(papers_by_date(self._db, start, end), limit))
+            members = list(members)
+            dated = []
+            for i in range(0, len(members), _MAX_PARAMS):
+                chunk = members[i:i + _MAX_PARAMS]
+                marks = ", ".join("?" * len(chunk))
+                dated.extend(self._db.execute(
+                    f"SELECT published, paper_id FROM paper_dates WHERE paper_id IN ({marks})",
+                    chunk,
+                ))
+        in_range = [
+            (published, paper_id) for published, paper_id in dated
+            if (start is None or published >= start) and (end is None or published < end)
+        ]
+        return [paper_id for _, paper_id in heapq.nlargest(limit, in_range)]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
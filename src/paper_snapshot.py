@@ -0,0 +1,516 @@
+"""Read-optimized, memory-mapped snapshot of the paper store."""
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from arxiv_atom import Paper
+from paper_store import ID_LOOKUP_TOPIC, topic_dir_name
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PAPSNAP3"
+
+# Rewrite the whole snapshot once superseded records take up more than
+# this fraction of its string heap.
+MAX_GARBAGE = 0.5
+
+# Header: magic, paper count, topic count, the file offsets of the paper
+# table, topic table, member array and string heap, the bytes of the heap
+# no entry points at any more, then a digest of the store's change marker
+# as of the last rebuild.
+_HEADER = struct.Struct("<8sIIQQQQQ16s")
+# A paper is six (heap offset, length) pairs: id, title, authors, summary,
+# pdf_url, published. Authors are joined with the unit separator, and a
+# missing PDF link is stored empty.
+_PAPER = struct.Struct("<" + "QI" * 6)
+# A topic is its name's (heap offset, length), then the index of its first
+# entry in the member array and its member count.
+_TOPIC = struct.Struct("<QIQI")
+_MEMBER = struct.Struct("<I")
+
+_AUTHOR_SEP = "\x1f"
+
+
+def store_marker(store) -> bytes:
+    """Digest the store's change marker to fit the snapshot header."""
+    return hashlib.blake2b(store.change_marker().encode(), digest_size=16).digest()
+
+
+def _encode_fields(paper_id: str, info: dict) -> Tuple[bytes, ...]:
+    return (
+        paper_id.encode(),
+        info['title'].encode(),
+        _AUTHOR_SEP.join(info['authors']).encode(),
+        info['summary'].encode(),
+        (info['pdf_url'] or '').encode(),
+        info['published'].encode(),
+    )
+
+
+class Snapshot:
+    """
+    One snapshot file, mapped read-only.
+
+    Papers are sorted by ID and topics by name, so both are found by binary
+    search over fixed-size entries, and fields are decoded straight from
+    the mapping one record at a time. Every process that maps the same file
+    shares its pages through the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as snapshot_file:
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.stat_key = (os.fstat(snapshot_file.fileno()).st_ino, len(self._map))
+        (
+            magic, self.paper_count, self.topic_count,
+            self._papers, self._topics, self._members, self._heap, self.garbage,
+            self.marker,
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a paper snapshot")
+
+    @property
+    def heap_size(self) -> int:
+        return len(self._map) - self._heap
+
+    def _bytes(self, offset: int, length: int) -> bytes:
+        start = self._heap + offset
+        return self._map[start:start + length]
+
+    def _paper_fields(self, index: int) -> tuple:
+        return _PAPER.unpack_from(self._map, self._papers + index * _PAPER.size)
+
+    def _paper_id(self, index: int) -> bytes:
+        offset, length = self._paper_fields(index)[:2]
+        return self._bytes(offset, length)
+
+    def _topic_fields(self, index: int) -> tuple:
+        return _TOPIC.unpack_from(self._map, self._topics + index * _TOPIC.size)
+
+    def _topic_name(self, index: int) -> bytes:
+        offset, length = self._topic_fields(index)[:2]
+        return self._bytes(offset, length)
+
+    @staticmethod
+    def _bisect(key: bytes, count: int, key_at) -> int:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @classmethod
+    def _search(cls, key: bytes, count: int, key_at) -> Optional[int]:
+        lo = cls._bisect(key, count, key_at)
+        if lo < count and key_at(lo) == key:
+            return lo
+        return None
+
+    def find(self, paper_id: str) -> Optional[int]:
+        return self._search(paper_id.encode(), self.paper_count, self._paper_id)
+
+    def insert_position(self, paper_id: str) -> int:
+        """Return the index a paper not in the snapshot would sort at."""
+        return self._bisect(paper_id.encode(), self.paper_count, self._paper_id)
+
+    def raw_paper(self, index: int) -> Tuple[bytes, ...]:
+        fields = self._paper_fields(index)
+        return tuple(self._bytes(fields[i], fields[i + 1]) for i in range(0, 12, 2))
+
+    def record(self, index: int) -> Tuple[str, dict]:
+        """Return the paper ID and its record in the format the tools return."""
+        raw = self.raw_paper(index)
+        paper_id, title, authors, summary, pdf_url, published = (field.decode() for field in raw)
+        return paper_id, {
+            'title': title,
+            'authors': authors.split(_AUTHOR_SEP) if authors else [],
+            'summary': summary,
+            'pdf_url': pdf_url or None,
+            'published': published,
+        }
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        index = self.find(paper_id)
+        return self.record(index)[1] if index is not None else None
+
+    def topic_members(self, name: str) -> Optional[List[int]]:
+        """Return the paper indexes of a topic, in stored order, or None."""
+        index = self._search(name.encode(), self.topic_count, self._topic_name)
+        if index is None:
+            return None
+        return [value for (value,) in _MEMBER.iter_unpack(self._member_bytes(index))]
+
+    def _member_bytes(self, topic_index: int) -> bytes:
+        _, _, start, count = self._topic_fields(topic_index)
+        offset = self._members + start * _MEMBER.size
+        return self._map[offset:offset + count * _MEMBER.size]
+
+    def topic_names(self) -> List[str]:
+        return [self._topic_name(i).decode() for i in range(self.topic_count)]
+
+
+def write_snapshot(
+    path: str,
+    papers: Dict[str, Tuple[bytes, ...]],
+    topics: Dict[str, List[str]],
+    marker: bytes = b"",
+) -> None:
+    """
+    Write a snapshot file from encoded papers and topic member lists.
+
+    `papers` maps each ID to the six encoded fields; `topics` maps each
+    topic name to its paper IDs in stored order; `marker` is the store's
+    change marker the contents reflect. The file is written to a
+    temporary name and renamed into place.
+    """
+    paper_ids = sorted(papers)
+    position = {paper_id: i for i, paper_id in enumerate(paper_ids)}
+    topic_names = sorted(topics)
+
+    heap = bytearray()
+
+    def intern(data: bytes) -> Tuple[int, int]:
+        offset = len(heap)
+        heap.extend(data)
+        return offset, len(data)
+
+    paper_table = bytearray()
+    for paper_id in paper_ids:
+        pairs = []
+        for field in papers[paper_id]:
+            pairs.extend(intern(field))
+        paper_table += _PAPER.pack(*pairs)
+
+    topic_table = bytearray()
+    members = bytearray()
+    member_count = 0
+    for name in topic_names:
+        ids = [position[paper_id] for paper_id in topics[name] if paper_id in position]
+        topic_table += _TOPIC.pack(*intern(name.encode()), member_count, len(ids))
+        members += struct.pack(f"<{len(ids)}I", *ids)
+        member_count += len(ids)
+
+    papers_at = _HEADER.size
+    topics_at = papers_at + len(paper_table)
+    members_at = topics_at + len(topic_table)
+    heap_at = members_at + len(members)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(_HEADER.pack(
+            MAGIC, len(paper_ids), len(topic_names),
+            papers_at, topics_at, members_at, heap_at, 0, marker,
+        ))
+        snapshot_file.write(paper_table)
+        snapshot_file.write(topic_table)
+        snapshot_file.write(members)
+        snapshot_file.write(heap)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot_delta(
+    path: str,
+    base: Snapshot,
+    papers: Dict[str, Tuple[bytes, ...]],
+    topics: Dict[str, List[str]],
+    marker: bytes = b"",
+) -> None:
+    """
+    Write a snapshot file that is `base` with some papers and topics replaced.
+
+    `papers` maps each new or changed paper ID to its six encoded fields, and
+    `topics` maps each changed topic to its paper IDs in stored order, or to
+    an empty list to drop it; every changed topic's papers must be in
+    `papers`. The base's string heap is copied across byte for byte and the
+    new fields are appended to it, so only the fixed-size tables are
+    rebuilt. Fields of replaced papers stay in the heap as garbage, counted
+    in the header, until a full rewrite drops them.
+    """
+    heap = bytearray()
+    base_heap_size = base.heap_size
+
+    def intern(data: bytes) -> Tuple[int, int]:
+        offset = base_heap_size + len(heap)
+        heap.extend(data)
+        return offset, len(data)
+
+    garbage = base.garbage
+    replaced: Dict[int, bytes] = {}
+    inserted: List[Tuple[int, str, bytes]] = []
+    for paper_id, fields in papers.items():
+        pairs = []
+        for field in fields:
+            pairs.extend(intern(field))
+        entry = _PAPER.pack(*pairs)
+        index = base.find(paper_id)
+        if index is None:
+            inserted.append((base.insert_position(paper_id), paper_id, entry))
+        else:
+            replaced[index] = entry
+            garbage += sum(base._paper_fields(index)[1::2])
+    inserted.sort()
+    # Base paper i moves up by the number of papers inserted at or before it.
+    positions = [position for position, _, _ in inserted]
+
+    def moved(index: int) -> int:
+        return index + bisect_right(positions, index)
+
+    position = {}
+    for index, (at, paper_id, _) in enumerate(inserted):
+        position[paper_id] = at + index
+    for paper_id in papers:
+        if paper_id not in position:
+            position[paper_id] = moved(base.find(paper_id))
+
+    paper_table = bytearray()
+    previous = 0
+    for at, _, entry in inserted:
+        paper_table += base._map[base._papers + previous * _PAPER.size:base._papers + at * _PAPER.size]
+        paper_table += entry
+        previous = at
+    paper_table += base._map[base._papers + previous * _PAPER.size:base._topics]
+    for index, entry in replaced.items():
+        at = moved(index) * _PAPER.size
+        paper_table[at:at + _PAPER.size] = entry
+
+    names = {name: index for index, name in enumerate(base.topic_names())}
+    names.update((name, None) for name in topics)
+    topic_table = bytearray()
+    members = bytearray()
+    member_count = 0
+    for name in sorted(names):
+        index = names[name]
+        if name in topics:
+            if not topics[name]:
+                continue
+            if index is None:
+                name_field = intern(name.encode())
+            else:
+                name_field = base._topic_fields(index)[:2]
+            ids = [position[paper_id] for paper_id in topics[name]]
+            member_bytes = struct.pack(f"<{len(ids)}I", *ids)
+        else:
+            fields = base._topic_fields(index)
+            name_field = fields[:2]
+            member_bytes = base._member_bytes(index)
+            if positions:
+                ids = [moved(value) for (value,) in _MEMBER.iter_unpack(member_bytes)]
+                member_bytes = struct.pack(f"<{len(ids)}I", *ids)
+        count = len(member_bytes) // _MEMBER.size
+        topic_table += _TOPIC.pack(*name_field, member_count, count)
+        members += member_bytes
+        member_count += count
+
+    papers_at = _HEADER.size
+    topics_at = papers_at + len(paper_table)
+    members_at = topics_at + len(topic_table)
+    heap_at = members_at + len(members)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(_HEADER.pack(
+            MAGIC, base.paper_count + len(inserted), len(topic_table) // _TOPIC.size,
+            papers_at, topics_at, members_at, heap_at, garbage, marker,
+        ))
+        snapshot_file.write(paper_table)
+        snapshot_file.write(topic_table)
+        snapshot_file.write(members)
+        with memoryview(base._map) as view:
+            snapshot_file.write(view[base._heap:])
+        snapshot_file.write(heap)
+    os.replace(tmp_path, path)
+
+
+class SnapshotManager:
+    """
+    Keep a Snapshot of a paper store current and answer reads from it.
+
+    Writes made through this process mark their topic and papers dirty;
+    reads of anything dirty go to the store until `rebuild` has folded the
+    changes in. A rebuild reads only the dirty topics from the store and
+    writes a new file that copies the current one's string heap byte for
+    byte, with just the changed fields appended; only the fixed-size tables
+    are rebuilt. Once replaced fields pass MAX_GARBAGE of the heap, the
+    next rebuild rewrites the whole file without them. Rebuilds across
+    processes are serialized with a lock file, and each process remaps the
+    file when another one replaces it, so other workers' writes show up
+    here within one rebuild interval.
+
+    Each file records the store's change marker as of its rebuild. If the
+    store has moved on by the time the file is opened, say because a
+    process wrote papers and exited before folding them in, reads go to
+    the store until the next rebuild has rebuilt the file in full.
+    """
+
+    def __init__(self, path: str, store):
+        self.path = path
+        self.store = store
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._dirty_topics: Set[str] = set()
+        self._dirty_papers: Set[str] = set()
+        # Changes being folded in by a running rebuild; still dirty until
+        # the new snapshot is in place.
+        self._building_topics: Set[str] = set()
+        self._building_papers: Set[str] = set()
+        self._hits = 0
+        self._fallbacks = 0
+        self._builds = 0
+        self._last_build_seconds = 0.0
+        self._remap()
+        self._behind = self._snapshot is not None and self._snapshot.marker != store_marker(store)
+        if self._behind:
+            logger.info("Snapshot %s is behind the store; rebuilding it in full", self.path)
+
+    def save_papers(self, topic: str, papers: Iterable[Paper]) -> str:
+        """Store papers through the store and mark what they touched dirty."""
+        papers = list(papers)
+        path = self.store.save_papers(topic, papers)
+        # Marked after the write, so a rebuild that already started reads
+        # the topic again on the next round instead of missing the change.
+        with self._lock:
+            self._dirty_topics.add(topic_dir_name(topic))
+            self._dirty_papers.update(paper.id for paper in papers)
+        return path
+
+    def _remap(self) -> bool:
+        """Map the file if it was replaced since it was last mapped."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        current = self._snapshot
+        if current is not None and current.stat_key == (st.st_ino, st.st_size):
+            return False
+        try:
+            # The old mapping is left to the garbage collector, so readers
+            # still holding it are unaffected.
+            self._snapshot = Snapshot(self.path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Ignoring unreadable snapshot %s: %s", self.path, e)
+            return False
+        return True
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        """Return the paper from the snapshot, or None to ask the store."""
+        snapshot = self._snapshot
+        if (
+            snapshot is None or self._behind
+            or paper_id in self._dirty_papers or paper_id in self._building_papers
+        ):
+            self._fallbacks += 1
+            return None
+        record = snapshot.get_paper(paper_id)
+        if record is None:
+            self._fallbacks += 1
+        else:
+            self._hits += 1
+        return record
+
+    def topic_papers(self, topic: str) -> Optional[Tuple[int, Iterator[Tuple[str, dict]]]]:
+        """
+        Return a topic's paper count and a lazy iterator over its papers.
+
+        Returns None when the store has to answer instead.
+        """
+        topic_name = topic_dir_name(topic)
+        snapshot = self._snapshot
+        if (
+            snapshot is None or self._behind
+            or topic_name in self._dirty_topics or topic_name in self._building_topics
+        ):
+            self._fallbacks += 1
+            return None
+        members = snapshot.topic_members(topic_name)
+        if members is None:
+            self._fallbacks += 1
+            return None
+        self._hits += 1
+        return len(members), (snapshot.record(index) for index in members)
+
+    def rebuild(self) -> bool:
+        """Fold dirty topics into a new snapshot, or build the first one."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._remap()
+                with self._lock:
+                    if self._snapshot is not None and not self._behind and not self._dirty_topics:
+                        return False
+                    self._building_topics, self._dirty_topics = self._dirty_topics, set()
+                    self._building_papers, self._dirty_papers = self._dirty_papers, set()
+                start = time.perf_counter()
+                try:
+                    self._build()
+                except BaseException:
+                    with self._lock:
+                        self._dirty_topics |= self._building_topics
+                        self._dirty_papers |= self._building_papers
+                    raise
+                finally:
+                    self._building_topics, self._building_papers = set(), set()
+                self._behind = False
+                self._builds += 1
+                self._last_build_seconds = time.perf_counter() - start
+                return True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _build(self) -> None:
+        # Read before the topics, so a write landing during the build moves
+        # the marker past the one recorded.
+        marker = store_marker(self.store)
+        snapshot = None if self._behind else self._snapshot
+        papers: Dict[str, Tuple[bytes, ...]] = {}
+        topics: Dict[str, List[str]] = {}
+        if snapshot is None:
+            changed = [*self.store.topics(), ID_LOOKUP_TOPIC]
+        else:
+            changed = self._building_topics
+        for name in changed:
+            papers_info = self.store.load_topic(name)
+            topics[name] = list(papers_info or ())
+            for paper_id, info in (papers_info or {}).items():
+                papers[paper_id] = _encode_fields(paper_id, info)
+
+        if snapshot is not None and snapshot.garbage <= MAX_GARBAGE * snapshot.heap_size:
+            write_snapshot_delta(self.path, snapshot, papers, topics, marker)
+        else:
+            if snapshot is not None:
+                # Rewrite in full, dropping the superseded fields.
+                for index in range(snapshot.paper_count):
+                    raw = snapshot.raw_paper(index)
+                    papers.setdefault(raw[0].decode(), raw)
+                ids = [snapshot._paper_id(index).decode() for index in range(snapshot.paper_count)]
+                for name in snapshot.topic_names():
+                    if name not in topics:
+                        topics[name] = [ids[index] for index in snapshot.topic_members(name)]
+            write_snapshot(
+                self.path, papers, {name: ids for name, ids in topics.items() if ids}, marker,
+            )
+        self._remap()
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            'papers': snapshot.paper_count if snapshot else 0,
+            'topics': snapshot.topic_count if snapshot else 0,
+            'bytes': snapshot.stat_key[1] if snapshot else 0,
+            'garbage_bytes': snapshot.garbage if snapshot else 0,
+            'dirty_topics': len(self._dirty_topics),
+            'hits': self._hits,
+            'fallbacks': self._fallbacks,
+            'builds': self._builds,
+            'last_build_seconds': round(self._last_build_seconds, 3),
+        }
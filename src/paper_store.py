@@ -0,0 +1,894 @@
+"""File-backed storage for paper records: one shared record log plus a directory per topic."""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from arxiv_atom import Paper
+from paper_index import PaperIndex
+from record_codec import TRAIN_MIN_SAMPLES, Codec, sample, train_zdict, zdict_id
+from topic_cache import TopicCache
+
+logger = logging.getLogger(__name__)
+
+RECORDS_FILE = "records.jsonl"
+RECORDS_INDEX_FILE = "records.idx"
+MEMBERS_FILE = "paper_ids.txt"
+META_FILE = "topic_meta.json"
+INDEX_FILE = "paper_index.sqlite3"
+# Topic directories live at topics/ab/cd/<name>, where abcd starts the
+# SHA-1 of the name, and topics.txt lists every topic that holds papers.
+TOPICS_DIR = "topics"
+MANIFEST_FILE = "topics.txt"
+# Compression dictionaries, by ID, and the ID of the one new records use.
+ZDICTS_DIR = "zdicts"
+CURRENT_ZDICT_FILE = "current"
+
+# Earlier layouts kept full records in every topic, plus an ID -> topic index.
+LEGACY_PAPERS_FILE = "papers_info.json"
+LEGACY_LOG_FILE = "papers_log.jsonl"
+LEGACY_INDEX_FILE = "paper_index.tsv"
+
+# Papers fetched by ID rather than by a topic search are filed here. Upper
+# case, which topic_dir_name never produces, so no searched topic maps onto
+# it; it is left out of topic listings.
+ID_LOOKUP_TOPIC = "ID_LOOKUP"
+
+_VERSION_SUFFIX = re.compile(r"v\d+$")
+
+
+def normalize_topic(topic: str) -> str:
+    """Fold a topic for matching: lower case, with runs of whitespace as one space."""
+    return " ".join(topic.lower().split())
+
+
+def topic_dir_name(topic: str) -> str:
+    if topic == ID_LOOKUP_TOPIC:
+        return topic
+    return normalize_topic(topic).replace(" ", "_")
+
+
+def upgrade_topic_name(name: str) -> str:
+    """
+    Map a topic directory name from an earlier layout to the current one.
+
+    Earlier versions replaced single spaces only, so "graph  nets" was
+    stored as graph__nets and " graph nets" as _graph_nets; both are now
+    graph_nets.
+    """
+    if name == ID_LOOKUP_TOPIC:
+        return name
+    return topic_dir_name(name.replace("_", " "))
+
+
+def base_id(paper_id: str) -> str:
+    """Strip the version from an arXiv ID: 2107.05580v1 -> 2107.05580."""
+    return _VERSION_SUFFIX.sub("", paper_id)
+
+
+def shard_path(name: str) -> str:
+    """Return a topic directory's path relative to the store root."""
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    return os.path.join(TOPICS_DIR, digest[:2], digest[2:4], name)
+
+
+def _dump_atomic(data, path: str) -> None:
+    """Write JSON to a temporary file and rename it over `path`."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as json_file:
+        json.dump(data, json_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _stat_key(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _encode_record(paper_id: str, info: dict, codec: Optional[Codec] = None) -> bytes:
+    if codec is not None:
+        packed = base64.b64encode(codec.compress(json.dumps(info))).decode()
+        return json.dumps({'id': paper_id, 'z': packed}).encode() + b"\n"
+    return json.dumps({'id': paper_id, **info}).encode() + b"\n"
+
+
+def _decode_record(line: bytes, codec: Codec) -> dict:
+    info = json.loads(line)
+    if 'z' in info:
+        return json.loads(codec.decompress(base64.b64decode(info['z'])))
+    del info['id']
+    return info
+
+
+class FileStore:
+    """
+    Paper records kept under `root`.
+
+    Every paper is stored once, in the shared append-only records.jsonl.
+    records.idx maps each paper ID to the offset and length of its latest
+    record there and is held in memory, so a lookup by ID is one positioned
+    read and a miss touches no file. A topic is a directory whose
+    paper_ids.txt lists its papers in the order they were first stored,
+    next to a topic_meta.json with bookkeeping such as the newest
+    timestamps seen. A save appends only the records that are new or
+    changed and the IDs new to the topic, so it costs what changed rather
+    than the size of the topic, and a paper stored under several topics
+    has a single record that all of them see.
+
+    Topic directories sit two levels of hash-named shards down, at
+    topics/ab/cd/<name>, so no directory grows too large, and topics.txt
+    lists every topic, so listing them reads one file instead of walking
+    the shards. Topics in the earlier flat layout are moved into their
+    shards the first time the store is used.
+
+    A changed record leaves its old version behind as garbage; once that
+    passes `compact_bytes` and `compact_garbage` of the log,
+    `compact_pending` copies the live records to a new log. Topics in the
+    earliest layout, with full records in papers_info.json and
+    papers_log.jsonl, are converted the first time the store is used.
+
+    Resolved topics are kept in a TopicCache of up to `cache_bytes`, checked
+    on every read against the stat of the topic's ID list and a generation
+    number that moves whenever a stored record changes, so rereading a hot
+    topic reads no files. The topic listing is cached the same way against
+    the manifest's stat.
+
+    With `index` set, every changed record is also added to the full-text,
+    author and date indexes in paper_index.sqlite3, which are brought up to
+    date with the record log when first opened.
+
+    With `compress` set, records are written deflated, base64-encoded in
+    their log line, with a dictionary trained on the stored summaries once
+    there are enough of them. Reads decode either form, so the option can
+    be switched at any time; existing records keep their form until they
+    change.
+
+    With `read_only` set, the store never writes: earlier layouts are left
+    as they are, and `read_topics` reads every topic in whichever layout it
+    is in, e.g. for an import into another store.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        compact_bytes: int = 1024**2,
+        compact_garbage: float = 0.5,
+        cache_bytes: int = 256 * 1024**2,
+        index: bool = True,
+        compress: bool = False,
+        read_only: bool = False,
+    ):
+        self.root = root
+        self.read_only = read_only
+        self.index = index and not read_only
+        self.compress = compress
+        self._codec = Codec(self._load_zdict)
+        self._train_lock = threading.Lock()
+        self.compact_bytes = compact_bytes
+        self.compact_garbage = compact_garbage
+        self._cache = TopicCache(cache_bytes)
+        self._topic_names: Optional[tuple] = None
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        # IDs of each written topic, loaded on its first write.
+        self._members: Dict[str, set] = {}
+        self._manifest_lock = threading.Lock()
+
+        self._records_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        # Base ID -> the most recently stored version's ID.
+        self._base_ids: Dict[str, str] = {}
+        self._records_size = 0
+        self._garbage = 0
+        self._generation = 0
+        self._reader: Optional[int] = None
+        self._appender = None
+        self._counters = {'appended': 0, 'unchanged': 0, 'compactions': 0}
+        self._paper_index: Optional[PaperIndex] = None
+        self._index_lock = threading.Lock()
+
+    def topic_path(self, topic: str) -> str:
+        return os.path.join(self.root, shard_path(topic_dir_name(topic)))
+
+    def _lock(self, name: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                current = self._read_current_zdict()
+                if current is not None:
+                    self._codec.use_zdict(current)
+                self._load_records()
+                if not self.read_only:
+                    self._convert_legacy_topics()
+                    self._shard_flat_topics()
+                self._loaded = True
+
+    # Shared record log
+
+    def _load_records(self) -> None:
+        """Load the record index, then index any records written after it."""
+        index_path = os.path.join(self.root, RECORDS_INDEX_FILE)
+        try:
+            with open(index_path, "r") as index_file:
+                for line in index_file:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) == 3:
+                        self._index_record(fields[0], int(fields[1]), int(fields[2]))
+        except FileNotFoundError:
+            pass
+
+        records_path = os.path.join(self.root, RECORDS_FILE)
+        try:
+            with open(records_path, "rb") as records_file:
+                records_file.seek(self._records_size)
+                tail = records_file.read()
+        except FileNotFoundError:
+            return
+        if not tail:
+            return
+        # Read-only stores leave repairs to the store that owns the files.
+        repair = not self.read_only
+
+        # Records whose index lines were lost, e.g. the whole index after a
+        # crash mid-compaction.
+        *lines, unfinished = tail.split(b"\n")
+        index_lines = []
+        offset = self._records_size
+        for line in lines:
+            length = len(line) + 1
+            try:
+                paper_id = json.loads(line)['id']
+            except (json.JSONDecodeError, KeyError):
+                self._garbage += length
+            else:
+                self._index_record(paper_id, offset, length)
+                index_lines.append(f"{paper_id}\t{offset}\t{length}\n")
+            offset += length
+        self._records_size = offset
+        if not repair:
+            return
+        if unfinished:
+            # Cut short by a crash; drop it so appends start clean.
+            os.truncate(records_path, offset)
+        with open(index_path, "a") as index_file:
+            index_file.writelines(index_lines)
+
+    def _index_record(self, paper_id: str, offset: int, length: int) -> None:
+        previous = self._offsets.get(paper_id)
+        if previous is not None:
+            self._garbage += previous[1]
+        self._offsets[paper_id] = (offset, length)
+        self._base_ids[base_id(paper_id)] = paper_id
+        self._records_size = max(self._records_size, offset + length)
+
+    def _read_fd(self) -> int:
+        if self._reader is None:
+            self._reader = os.open(os.path.join(self.root, RECORDS_FILE), os.O_RDONLY)
+        return self._reader
+
+    def _read_records(self, paper_ids: Iterable[str]) -> Tuple[Dict[str, dict], int]:
+        """Return the stored records among `paper_ids` and their size in bytes."""
+        records, size = {}, 0
+        with self._records_lock:
+            for paper_id in paper_ids:
+                location = self._offsets.get(paper_id)
+                if location is None:
+                    continue
+                offset, length = location
+                records[paper_id] = _decode_record(
+                    os.pread(self._read_fd(), length, offset), self._codec
+                )
+                size += length
+        return records, size
+
+    def _store_records(self, infos: Dict[str, dict]) -> Dict[str, dict]:
+        """Append the records that are new or differ from the stored ones and return those."""
+        with self._records_lock:
+            changed = {}
+            for paper_id, info in infos.items():
+                location = self._offsets.get(paper_id)
+                if location is not None:
+                    offset, length = location
+                    stored = _decode_record(os.pread(self._read_fd(), length, offset), self._codec)
+                    if stored == info:
+                        self._counters['unchanged'] += 1
+                        continue
+                    # Cached topics may hold the old version.
+                    self._generation += 1
+                changed[paper_id] = info
+            if not changed:
+                return changed
+
+            if self._appender is None:
+                os.makedirs(self.root, exist_ok=True)
+                self._appender = open(os.path.join(self.root, RECORDS_FILE), "ab")
+            codec = self._codec if self.compress else None
+            lines = [_encode_record(paper_id, info, codec) for paper_id, info in changed.items()]
+            self._appender.write(b"".join(lines))
+            self._appender.flush()
+
+            index_lines = []
+            offset = self._records_size
+            for paper_id, line in zip(changed, lines):
+                self._index_record(paper_id, offset, len(line))
+                index_lines.append(f"{paper_id}\t{offset}\t{len(line)}\n")
+                offset += len(line)
+            with open(os.path.join(self.root, RECORDS_INDEX_FILE), "a") as index_file:
+                index_file.writelines(index_lines)
+            self._counters['appended'] += len(lines)
+        return changed
+
+    def compact_pending(self) -> int:
+        """Compact the record log if enough of it is garbage. Returns 1 if it did."""
+        if self.read_only or self._garbage < max(self.compact_bytes, self.compact_garbage * self._records_size):
+            return 0
+        self.compact()
+        return 1
+
+    def compact(self) -> None:
+        """
+        Copy the live records to a new log and swap it in.
+
+        The bulk of the copy runs without blocking readers or writers; only
+        the records appended meanwhile are copied under the lock.
+        """
+        self._ensure_loaded()
+        with self._compact_lock:
+            records_path = os.path.join(self.root, RECORDS_FILE)
+            index_path = os.path.join(self.root, RECORDS_INDEX_FILE)
+            tmp_path = records_path + ".compact"
+            with self._records_lock:
+                if not self._offsets:
+                    return
+                live = sorted(self._offsets.items(), key=lambda item: item[1][0])
+                copied_to = self._records_size
+                fd = self._read_fd()
+
+            offsets, garbage, position = {}, 0, 0
+            with open(tmp_path, "wb") as out:
+                for paper_id, (offset, length) in live:
+                    out.write(os.pread(fd, length, offset))
+                    offsets[paper_id] = (position, length)
+                    position += length
+
+                with self._records_lock:
+                    tail = os.pread(fd, self._records_size - copied_to, copied_to)
+                    out.write(tail)
+                    out.flush()
+                    for line in tail.split(b"\n")[:-1]:
+                        paper_id = json.loads(line)['id']
+                        if paper_id in offsets:
+                            garbage += offsets[paper_id][1]
+                        offsets[paper_id] = (position, len(line) + 1)
+                        position += len(line) + 1
+
+                    # Without an index the log is rescanned on load, so a
+                    # crash anywhere in the swap leaves a consistent store.
+                    try:
+                        os.remove(index_path)
+                    except FileNotFoundError:
+                        pass
+                    os.replace(tmp_path, records_path)
+                    with open(index_path + ".tmp", "w") as index_file:
+                        index_file.writelines(
+                            f"{paper_id}\t{offset}\t{length}\n"
+                            for paper_id, (offset, length) in offsets.items()
+                        )
+                    os.replace(index_path + ".tmp", index_path)
+
+                    os.close(fd)
+                    self._reader = None
+                    if self._appender is not None:
+                        self._appender.close()
+                        self._appender = None
+                    self._offsets = offsets
+                    self._records_size = position
+                    self._garbage = garbage
+                    self._counters['compactions'] += 1
+
+    # Topics
+
+    def save_papers(self, topic: str, papers: Iterable[Paper]) -> str:
+        """Merge papers into the topic and return the path of its ID list."""
+        if self.read_only:
+            raise RuntimeError(f"The paper store at {self.root} is read-only")
+        self._ensure_loaded()
+        name = topic_dir_name(topic)
+        papers = list(papers)
+        infos = {paper.id: paper.to_info() for paper in papers}
+        if self.compress and not self._codec.trained:
+            self._train_zdict(infos)
+        changed = self._store_records(infos)
+        if changed and self.index:
+            self._open_index().add(changed)
+        path = self.topic_path(topic)
+        os.makedirs(path, exist_ok=True)
+        members_path = os.path.join(path, MEMBERS_FILE)
+
+        with self._lock(name):
+            members = self._members.get(name)
+            if members is None:
+                members = self._members[name] = set(self._read_members(name))
+            generation = self._generation
+            cached = self._cache.peek(name, self._signature(name, generation))
+
+            new_ids = [paper_id for paper_id in infos if paper_id not in members]
+            if new_ids:
+                if not members:
+                    # Listed before its first paper lands, so a crash can
+                    # leave an empty topic listed but never a topic unlisted.
+                    self._add_to_manifest([name])
+                elif not changed.keys() >= set(new_ids):
+                    # Filing stored papers under a topic appends to neither
+                    # the record log nor the manifest; touch the manifest
+                    # so the change marker still moves.
+                    os.utime(os.path.join(self.root, MANIFEST_FILE))
+                with open(members_path, "a") as members_file:
+                    members_file.writelines(f"{paper_id}\n" for paper_id in new_ids)
+                members.update(new_ids)
+
+            if cached is not None:
+                # Readers may still hold the old dict, so replace it. Using
+                # the generation read before the append keeps a concurrent
+                # change to a shared record from being masked.
+                updated = {**cached, **infos}
+                self._cache.put(
+                    name, self._signature(name, generation), updated,
+                    self._topic_bytes(updated),
+                )
+            else:
+                self._cache.invalidate(name)
+
+            self._advance_high_water(topic, papers)
+        return members_path
+
+    def _read_members(self, name: str) -> List[str]:
+        return self._read_member_file(os.path.join(self.root, shard_path(name)))
+
+    @staticmethod
+    def _read_member_file(path: str) -> List[str]:
+        try:
+            with open(os.path.join(path, MEMBERS_FILE), "r") as members_file:
+                # A line cut short by a crash names no stored paper.
+                return list(dict.fromkeys(
+                    line[:-1] for line in members_file if line.endswith("\n")
+                ))
+        except FileNotFoundError:
+            return []
+
+    def _signature(self, name: str, generation: Optional[int] = None) -> tuple:
+        """Identify the current contents of a resolved topic."""
+        return (
+            _stat_key(os.path.join(self.root, shard_path(name), MEMBERS_FILE)),
+            self._generation if generation is None else generation,
+        )
+
+    def _topic_bytes(self, papers_info: Dict[str, dict]) -> int:
+        return sum(self._offsets.get(paper_id, (0, 0))[1] for paper_id in papers_info)
+
+    def load_topic(self, topic: str) -> Optional[Dict[str, dict]]:
+        """
+        Return the topic's stored papers keyed by ID, or None if it has none.
+
+        The dict may be shared with other callers and must not be modified.
+        """
+        self._ensure_loaded()
+        name = topic_dir_name(topic)
+        with self._lock(name):
+            signature = self._signature(name)
+            papers_info = self._cache.get(name, signature)
+            if papers_info is None:
+                paper_ids = self._read_members(name)
+                if not paper_ids:
+                    return None
+                records, size = self._read_records(paper_ids)
+                papers_info = {
+                    paper_id: records[paper_id] for paper_id in paper_ids if paper_id in records
+                }
+                self._cache.put(name, signature, papers_info, size)
+        return papers_info or None
+
+    def load_topic_meta(self, topic: str) -> dict:
+        """Return the topic's bookkeeping, such as its high-water marks."""
+        return self._read_meta(self.topic_path(topic))
+
+    @staticmethod
+    def _read_meta(path: str) -> dict:
+        meta_path = os.path.join(path, META_FILE)
+        try:
+            with open(meta_path, "r") as json_file:
+                return json.load(json_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _advance_high_water(self, topic: str, papers: List[Paper]) -> None:
+        """
+        Record the newest `published` and `updated` timestamps seen for a topic.
+
+        arXiv timestamps are ISO 8601 in UTC, so they compare as strings.
+        """
+        if not papers:
+            return
+        meta = self.load_topic_meta(topic)
+        high_water = meta.get("high_water", {})
+        advanced = dict(high_water)
+        for field in ("published", "updated"):
+            newest = max(getattr(paper, field) for paper in papers)
+            if newest > advanced.get(field, ""):
+                advanced[field] = newest
+        if advanced == high_water:
+            return
+
+        meta["high_water"] = advanced
+        _dump_atomic(meta, os.path.join(self.topic_path(topic), META_FILE))
+
+    def topics(self) -> List[str]:
+        """Return the names of the searched topics that hold papers, from the manifest."""
+        self._ensure_loaded()
+        manifest_path = os.path.join(self.root, MANIFEST_FILE)
+        signature = _stat_key(manifest_path)
+        if signature is None:
+            return []
+        topic_names = self._topic_names
+        if topic_names is not None and topic_names[0] == signature:
+            return list(topic_names[1])
+        with open(manifest_path, "r") as manifest_file:
+            # A line cut short by a crash names no topic.
+            names = list(dict.fromkeys(
+                line[:-1] for line in manifest_file
+                if line.endswith("\n") and line[:-1] != ID_LOOKUP_TOPIC
+            ))
+        self._topic_names = (signature, names)
+        return list(names)
+
+    def change_marker(self) -> str:
+        """
+        Return a value that changes whenever papers or topics are saved.
+
+        Every save grows the record log or touches the manifest. Compaction
+        moves it too, which only costs a reader one needless refresh.
+        """
+        records = _stat_key(os.path.join(self.root, RECORDS_FILE))
+        return f"{records[1] if records else 0}:{_stat_key(os.path.join(self.root, MANIFEST_FILE))}"
+
+    def _add_to_manifest(self, names: List[str]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        with self._manifest_lock:
+            with open(os.path.join(self.root, MANIFEST_FILE), "a") as manifest_file:
+                manifest_file.writelines(f"{name}\n" for name in names)
+
+    def read_topics(self) -> Iterator[Tuple[str, Dict[str, dict], dict]]:
+        """
+        Yield the name, stored papers and bookkeeping of every topic.
+
+        Unlike `topics`, this finds topics in every layout the store has
+        used, sharded, flat or with full records per topic, and writes
+        nothing, so a read-only store can be imported without converting it.
+        """
+        self._ensure_loaded()
+        if not os.path.isdir(self.root):
+            return
+        topic_paths = [
+            (name, os.path.join(self.root, shard_path(name))) for name in self._sharded_topics()
+        ]
+        topic_paths.extend(
+            (item, os.path.join(self.root, item))
+            for item in sorted(os.listdir(self.root))
+            if item != TOPICS_DIR and os.path.isdir(os.path.join(self.root, item))
+        )
+        for name, path in topic_paths:
+            if os.path.isfile(os.path.join(path, MEMBERS_FILE)):
+                paper_ids = self._read_member_file(path)
+                records, _ = self._read_records(paper_ids)
+                papers_info = {
+                    paper_id: records[paper_id] for paper_id in paper_ids if paper_id in records
+                }
+            elif any(
+                os.path.isfile(os.path.join(path, legacy))
+                for legacy in (LEGACY_PAPERS_FILE, LEGACY_LOG_FILE)
+            ):
+                papers_info = self._fold_legacy(path)
+            else:
+                continue
+            if papers_info:
+                yield name, papers_info, self._read_meta(path)
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        """Return the record stored under exactly `paper_id`, or None."""
+        self._ensure_loaded()
+        if paper_id not in self._offsets:
+            return None
+        return self._read_records([paper_id])[0].get(paper_id)
+
+    def find_papers(self, paper_ids: List[str]) -> Dict[str, dict]:
+        """
+        Look up several papers by ID.
+
+        An ID without a version also matches the most recently stored version
+        of that paper; an ID with one matches only that version. Returns the
+        records found, keyed by the requested ID.
+        """
+        self._ensure_loaded()
+        resolved = {}
+        for paper_id in paper_ids:
+            if paper_id in self._offsets:
+                resolved[paper_id] = paper_id
+            elif base_id(paper_id) == paper_id and paper_id in self._base_ids:
+                resolved[paper_id] = self._base_ids[paper_id]
+        records, _ = self._read_records(set(resolved.values()))
+        return {
+            requested: records[stored_id]
+            for requested, stored_id in resolved.items()
+            if stored_id in records
+        }
+
+    # Query indexes
+
+    def _open_index(self) -> PaperIndex:
+        with self._index_lock:
+            if self._paper_index is None:
+                os.makedirs(self.root, exist_ok=True)
+                paper_index = PaperIndex(os.path.join(self.root, INDEX_FILE))
+                missing = paper_index.unindexed(list(self._offsets))
+                for i in range(0, len(missing), 1000):
+                    paper_index.add(self._read_records(missing[i:i + 1000])[0])
+                paper_index.mark_current()
+                if missing:
+                    logger.info("Indexed %d stored papers", len(missing))
+                self._paper_index = paper_index
+            return self._paper_index
+
+    def search(self, query: str, limit: int) -> List[str]:
+        """Return the IDs of the stored papers matching `query`, best match first."""
+        self._ensure_loaded()
+        if not self.index:
+            return []
+        return self._open_index().search(query, limit)
+
+    def papers_by_author(self, name: str, limit: int) -> List[str]:
+        """Return the IDs of the stored papers by `name`, newest first."""
+        self._ensure_loaded()
+        if not self.index:
+            return []
+        return self._open_index().papers_by_author(name, limit)
+
+    def papers_by_date(
+        self,
+        start: Optional[str],
+        end: Optional[str],
+        topic: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[str]:
+        """Return the IDs of the stored papers published in [start, end), newest first."""
+        self._ensure_loaded()
+        if not self.index:
+            return []
+        members = None
+        if topic is not None:
+            members = self._read_members(topic_dir_name(topic))
+            if not members:
+                return []
+        return self._open_index().papers_by_date(start, end, limit, members)
+
+    # Compression dictionaries
+
+    def _zdict_path(self, dict_id: int) -> str:
+        return os.path.join(self.root, ZDICTS_DIR, f"{dict_id:08x}.zdict")
+
+    def _load_zdict(self, dict_id: int) -> Optional[bytes]:
+        try:
+            with open(self._zdict_path(dict_id), "rb") as zdict_file:
+                return zdict_file.read()
+        except FileNotFoundError:
+            return None
+
+    def _read_current_zdict(self) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.root, ZDICTS_DIR, CURRENT_ZDICT_FILE), "r") as current_file:
+                return self._load_zdict(int(current_file.read().strip(), 16))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _train_zdict(self, incoming: Dict[str, dict]) -> None:
+        """Train the compression dictionary once enough summaries are stored."""
+        if len(self._offsets) + len(incoming) < TRAIN_MIN_SAMPLES:
+            return
+        with self._train_lock:
+            if self._codec.trained:
+                return
+            paper_ids = sample(list(self._offsets))
+            records, _ = self._read_records(paper_ids)
+            summaries = [info['summary'] for info in [*records.values(), *incoming.values()]]
+            zdict = train_zdict(summaries)
+            dict_id = zdict_id(zdict)
+
+            # Saved before the codec switches to it, so no record is ever
+            # written with a dictionary that is not on disk.
+            os.makedirs(os.path.join(self.root, ZDICTS_DIR), exist_ok=True)
+            path = self._zdict_path(dict_id)
+            with open(path + ".tmp", "wb") as zdict_file:
+                zdict_file.write(zdict)
+            os.replace(path + ".tmp", path)
+            current_path = os.path.join(self.root, ZDICTS_DIR, CURRENT_ZDICT_FILE)
+            with open(current_path + ".tmp", "w") as current_file:
+                current_file.write(f"{dict_id:08x}\n")
+            os.replace(current_path + ".tmp", current_path)
+            self._codec.use_zdict(zdict)
+            logger.info("Trained a %d-byte compression dictionary on %d summaries", len(zdict), len(summaries))
+
+    # Earlier layouts
+
+    def _shard_flat_topics(self) -> None:
+        """
+        Move topic directories from the root into their shards.
+
+        Each topic is added to the manifest before its directory is renamed,
+        so after a crash it is listed and the next start finishes the move.
+        If the manifest is missing, it is rebuilt from the shards. Names
+        from earlier layouts are brought up to date on the way, merging
+        directories that now name the same topic.
+        """
+        if not os.path.isdir(self.root):
+            return
+        if not os.path.exists(os.path.join(self.root, MANIFEST_FILE)):
+            self._rebuild_manifest()
+        flat = [
+            item for item in os.listdir(self.root)
+            if item != TOPICS_DIR
+            and os.path.isfile(os.path.join(self.root, item, MEMBERS_FILE))
+        ]
+        if not flat:
+            return
+        self._add_to_manifest(sorted({upgrade_topic_name(item) for item in flat}))
+        for item in flat:
+            source = os.path.join(self.root, item)
+            target = os.path.join(self.root, shard_path(upgrade_topic_name(item)))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                if os.path.isdir(target):
+                    self._merge_topic_dir(source, target)
+                else:
+                    os.rename(source, target)
+            except FileNotFoundError:
+                # Moved by another process sharing the store.
+                continue
+            except OSError as e:
+                logger.warning("Could not move topic %s into its shard: %s", item, e)
+        logger.info("Moved %d topics in %s into sharded directories", len(flat), self.root)
+
+    def _merge_topic_dir(self, source: str, target: str) -> None:
+        """Fold a topic directory into another one for the same topic, then remove it."""
+        known = set(self._read_member_file(target))
+        new_ids = [
+            paper_id for paper_id in self._read_member_file(source) if paper_id not in known
+        ]
+        if new_ids:
+            with open(os.path.join(target, MEMBERS_FILE), "a") as members_file:
+                members_file.writelines(f"{paper_id}\n" for paper_id in new_ids)
+        meta = self._read_meta(target)
+        high_water = meta.get("high_water", {})
+        merged = dict(high_water)
+        for field, value in self._read_meta(source).get("high_water", {}).items():
+            if value > merged.get(field, ""):
+                merged[field] = value
+        if merged != high_water:
+            meta["high_water"] = merged
+            _dump_atomic(meta, os.path.join(target, META_FILE))
+        shutil.rmtree(source)
+
+    def _sharded_topics(self) -> List[str]:
+        """List the topics in the shards by walking them, without the manifest."""
+        names = []
+        topics_root = os.path.join(self.root, TOPICS_DIR)
+        if os.path.isdir(topics_root):
+            for first in os.listdir(topics_root):
+                for second in os.listdir(os.path.join(topics_root, first)):
+                    shard = os.path.join(topics_root, first, second)
+                    names.extend(
+                        name for name in os.listdir(shard)
+                        if os.path.isfile(os.path.join(shard, name, MEMBERS_FILE))
+                    )
+        return sorted(names)
+
+    def _rebuild_manifest(self) -> None:
+        names = self._sharded_topics()
+        manifest_path = os.path.join(self.root, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w") as manifest_file:
+            manifest_file.writelines(f"{name}\n" for name in names)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _convert_legacy_topics(self) -> None:
+        """Move records out of old-layout topic directories into the shared log."""
+        if not os.path.isdir(self.root):
+            return
+        converted = 0
+        for item in os.listdir(self.root):
+            path = os.path.join(self.root, item)
+            legacy_files = [
+                os.path.join(path, name) for name in (LEGACY_PAPERS_FILE, LEGACY_LOG_FILE)
+                if os.path.isfile(os.path.join(path, name))
+            ]
+            if not legacy_files:
+                continue
+            members_path = os.path.join(path, MEMBERS_FILE)
+            if not os.path.exists(members_path):
+                papers_info = self._fold_legacy(path)
+                self._store_records(papers_info)
+                with open(members_path + ".tmp", "w") as members_file:
+                    members_file.writelines(f"{paper_id}\n" for paper_id in papers_info)
+                os.replace(members_path + ".tmp", members_path)
+                converted += 1
+            # The ID list is in place, so the full copies can go.
+            for legacy_file in legacy_files:
+                os.remove(legacy_file)
+        try:
+            os.remove(os.path.join(self.root, LEGACY_INDEX_FILE))
+        except FileNotFoundError:
+            pass
+        if converted:
+            logger.info("Moved %d topics in %s to the shared record log", converted, self.root)
+
+    @staticmethod
+    def _fold_legacy(path: str) -> Dict[str, dict]:
+        """Read an old-layout topic: its snapshot with its log applied."""
+        try:
+            with open(os.path.join(path, LEGACY_PAPERS_FILE), "r") as json_file:
+                papers_info = json.load(json_file)
+            if not isinstance(papers_info, dict):
+                papers_info = {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            papers_info = {}
+        try:
+            with open(os.path.join(path, LEGACY_LOG_FILE), "r") as log_file:
+                for line in log_file:
+                    try:
+                        info = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    papers_info[info.pop('id')] = info
+        except FileNotFoundError:
+            pass
+        return papers_info
+
+    def close(self) -> None:
+        with self._index_lock:
+            if self._paper_index is not None:
+                self._paper_index.close()
+                self._paper_index = None
+        with self._records_lock:
+            if self._reader is not None:
+                os.close(self._reader)
+                self._reader = None
+            if self._appender is not None:
+                self._appender.close()
+                self._appender = None
+
+    def stats(self) -> dict:
+        self._ensure_loaded()
+        return {
+            'backend': 'files',
+            'root': self.root,
+            'records': len(self._offsets),
+            'record_log_bytes': self._records_size,
+            'garbage_bytes': self._garbage,
+            'compressed': self.compress,
+            **self._counters,
+            'topic_cache': self._cache.stats(),
+        }
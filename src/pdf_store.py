@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import os
+import re
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import httpx
+
+from arxiv_fetch import is_valid_arxiv_id
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_VERSIONED_ID = re.compile(r"^(?P<base>.+?)(?P<version>v\d+)$")
+# Bytes handed to the writer thread at a time while downloading.
+_CHUNK_SIZE = 256 * 1024
+
+
+class PdfDownloadError(Exception):
+    """Raised when a PDF cannot be downloaded."""
+
+
+class PdfStore:
+    """
+    Local store of arXiv PDFs keyed by base ID and version.
+
+    A paper version's PDF never changes, so `2107.05580v1` is kept at
+    `<root>/2107.05580/v1.pdf` and served from disk forever after the first
+    download. Downloads run at most `concurrency` at a time, concurrent
+    requests for the same file share one download, and an interrupted
+    download resumes from its `.part` file with an HTTP range request.
+    Once the store grows past `max_bytes`, the least recently read PDFs are
+    deleted. File I/O runs in worker threads, including the scan of the
+    files already stored, which happens before the first fetch.
+    """
+
+    def __init__(self, root: str, max_bytes: int, concurrency: int = 4, timeout: float = 120.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._client = httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._flights = SingleFlight()
+        self._hits = 0
+        self._downloads = 0
+        self._resumed = 0
+        self._evictions = 0
+
+        # LRU of stored files, least recently used first.
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._scanned = False
+        self._scan_lock = asyncio.Lock()
+
+    async def _ensure_scanned(self) -> None:
+        if self._scanned:
+            return
+        async with self._scan_lock:
+            if not self._scanned:
+                for path, size in await asyncio.to_thread(self._scan):
+                    self._files[path] = size
+                self._total_bytes = sum(self._files.values())
+                self._scanned = True
+
+    def _scan(self) -> List[Tuple[str, int]]:
+        """Return the stored PDFs and their sizes, least recently used first."""
+        os.makedirs(self.root, exist_ok=True)
+        stored = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".pdf"):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    stored.append((stat.st_mtime, path, stat.st_size))
+        return [(path, size) for _, path, size in sorted(stored)]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def path_for(self, paper_id: str) -> str:
+        """Return where the PDF for a versioned paper ID is stored."""
+        if not is_valid_arxiv_id(paper_id):
+            raise ValueError(f"{paper_id!r} is not an arXiv ID")
+        match = _VERSIONED_ID.match(paper_id)
+        if match is None:
+            raise ValueError(f"PDFs are stored per version; {paper_id} has none")
+        # Pre-2007 IDs contain a slash (quant-ph/0201082).
+        base = match.group("base").replace("/", "_")
+        return os.path.join(self.root, base, match.group("version") + ".pdf")
+
+    def cached_path(self, paper_id: str) -> Optional[str]:
+        """Return the stored PDF's path, marking it recently used, or None."""
+        path = self.path_for(paper_id)
+        if path not in self._files:
+            return None
+        self._files.move_to_end(path)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._forget(path)
+            return None
+        self._hits += 1
+        return path
+
+    async def fetch(self, paper_id: str, url: str) -> str:
+        """Return the local path of the paper's PDF, downloading it if needed."""
+        await self._ensure_scanned()
+        path = self.cached_path(paper_id)
+        if path is not None:
+            return path
+        path = self.path_for(paper_id)
+        return await self._flights.do(path, lambda: self._download(url, path))
+
+    async def _download(self, url: str, path: str) -> str:
+        async with self._semaphore:
+            part_path = path + ".part"
+            offset = await asyncio.to_thread(self._prepare, path)
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+            async with self._client.stream("GET", url, headers=headers) as resp:
+                if resp.status_code == httpx.codes.PARTIAL_CONTENT:
+                    mode = "ab"
+                    self._resumed += 1
+                elif resp.status_code == httpx.codes.OK:
+                    # Server ignored the range; start over.
+                    mode = "wb"
+                else:
+                    if resp.status_code == httpx.codes.REQUESTED_RANGE_NOT_SATISFIABLE:
+                        await asyncio.to_thread(os.remove, part_path)
+                    raise PdfDownloadError(f"HTTP {resp.status_code} from {url}")
+                part_file = await asyncio.to_thread(open, part_path, mode)
+                try:
+                    async for chunk in resp.aiter_bytes(_CHUNK_SIZE):
+                        await asyncio.to_thread(part_file.write, chunk)
+                finally:
+                    await asyncio.to_thread(part_file.close)
+
+            size = await asyncio.to_thread(self._finish, url, part_path, path)
+
+        self._files[path] = size
+        self._total_bytes += size
+        self._downloads += 1
+        logger.info("Stored %s (%d bytes)", path, size)
+        self._evict(keep=path)
+        return path
+
+    @staticmethod
+    def _prepare(path: str) -> int:
+        """Create the PDF's directory and return the size of any partial download."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            return os.path.getsize(path + ".part")
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _finish(url: str, part_path: str, path: str) -> int:
+        """Move a complete download into place and return its size."""
+        with open(part_path, "rb") as part_file:
+            if part_file.read(5) != b"%PDF-":
+                os.remove(part_path)
+                raise PdfDownloadError(f"{url} did not return a PDF")
+        os.replace(part_path, path)
+        return os.path.getsize(path)
+
+    def _evict(self, keep: str) -> None:
+        while self._total_bytes > self.max_bytes and len(self._files) > 1:
+            path = next(iter(self._files))
+            if path == keep:
+                self._files.move_to_end(path)
+                continue
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                # Already gone, or other versions share the directory.
+                pass
+            self._forget(path)
+            self._evictions += 1
+
+    def _forget(self, path: str) -> None:
+        self._total_bytes -= self._files.pop(path, 0)
+
+    def stats(self) -> dict:
+        return {
+            'files': len(self._files),
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self._hits,
+            'downloads': self._downloads,
+            'resumed': self._resumed,
+            'evictions': self._evictions,
+            'in_flight': self._flights.stats()['in_flight'],
+        }
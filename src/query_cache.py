@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from paper_store import normalize_topic
+
+
+def query_key(topic: str, max_results: int, sort_by: str) -> str:
+    """Build the cache key for a search, ignoring case and extra whitespace."""
+    return f"{normalize_topic(topic)}|{max_results}|{sort_by}"
+
+
+class QueryCache:
+    """
+    Two-tier cache mapping a search to the paper IDs it returned.
+
+    L1 is an in-memory LRU; L2 is a SQLite file that survives restarts.
+    Both tiers hold entries for `ttl` seconds and evict the least recently
+    used entry once they exceed their size cap. Paper records themselves
+    live in the topic store, so only the ID lists are cached here.
+    """
+
+    def __init__(self, path: str, ttl: float, l1_size: int, l2_size: int):
+        self.ttl = ttl
+        self.l1_size = l1_size
+        self.l2_size = l2_size
+        self._l1: "OrderedDict[str, tuple]" = OrderedDict()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS queries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS queries_last_access ON queries (last_access)"
+            )
+            self._l2_count = self._db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+
+        self._counters = {
+            'l1_hits': 0,
+            'l2_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'l1_evictions': 0,
+            'l2_evictions': 0,
+        }
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached IDs for `key`, or None on a miss."""
+        entry = self._l1.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires > time.time():
+                self._l1.move_to_end(key)
+                self._counters['l1_hits'] += 1
+                return value
+            del self._l1[key]
+            self._counters['expired'] += 1
+
+        entry = await asyncio.to_thread(self._get_l2, key)
+        if entry is None:
+            self._counters['misses'] += 1
+            return None
+        value, expires = entry
+        self._counters['l2_hits'] += 1
+        self._put_l1(key, value, expires)
+        return value
+
+    async def remaining_ttl(self, key: str) -> float:
+        """Seconds before the entry for `key` expires; 0 if there is none."""
+        entry = self._l1.get(key)
+        if entry is None:
+            entry = await asyncio.to_thread(self._peek_l2, key)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry[1] - time.time())
+
+    async def put(self, key: str, value: List[str]) -> None:
+        expires = time.time() + self.ttl
+        self._put_l1(key, value, expires)
+        await asyncio.to_thread(self._put_l2, key, value, expires)
+
+    def _put_l1(self, key: str, value: List[str], expires: float) -> None:
+        self._l1[key] = (value, expires)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_size:
+            self._l1.popitem(last=False)
+            self._counters['l1_evictions'] += 1
+
+    def _get_l2(self, key: str) -> Optional[tuple]:
+        now = time.time()
+        with self._db_lock, self._db:
+            row = self._db.execute(
+                "SELECT value, expires FROM queries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM queries WHERE key = ?", (key,))
+                self._l2_count -= 1
+                self._counters['expired'] += 1
+                return None
+            self._db.execute(
+                "UPDATE queries SET last_access = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0]), row[1]
+
+    def _peek_l2(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires FROM queries WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def _put_l2(self, key: str, value: List[str], expires: float) -> None:
+        with self._db_lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO queries (key, value, expires, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires, time.time()),
+            )
+            if cursor.rowcount:
+                self._l2_count += 1
+            else:
+                self._db.execute(
+                    "UPDATE queries SET value = ?, expires = ?, last_access = ?"
+                    " WHERE key = ?",
+                    (json.dumps(value), expires, time.time(), key),
+                )
+            excess = self._l2_count - self.l2_size
+            if excess > 0:
+                # Expired entries go first, then the least recently used.
+                self._db.execute(
+                    "DELETE FROM queries WHERE key IN ("
+                    " SELECT key FROM queries"
+                    " ORDER BY expires > ?, last_access LIMIT ?)",
+                    (time.time(), excess),
+                )
+                self._l2_count -= excess
+                self._counters['l2_evictions'] += excess
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            'l1_entries': len(self._l1),
+            'l2_entries': self._l2_count,
+            'ttl_seconds': self.ttl,
+        }
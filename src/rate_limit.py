@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by every coroutine that talks to one upstream.
+
+    Tokens refill continuously at `rate` per second up to `burst`. Callers
+    queue on an `asyncio.Lock`, which wakes waiters in FIFO order, so the
+    head of the queue is the only one sleeping for the next token.
+
+    Background callers only take a token while no interactive caller is
+    waiting, and give way again if one arrives while they sleep, so
+    prefetching never delays a user-facing request.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._no_interactive = asyncio.Event()
+        self._no_interactive.set()
+        self._last_interactive = float("-inf")
+
+        self._waiting = 0
+        self._interactive_waiting = 0
+        self._max_waiting = 0
+        self._acquired = 0
+        self._background_acquired = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def acquire(self, background: bool = False) -> float:
+        """Wait for a token and return how many seconds the caller waited."""
+        start = time.monotonic()
+        self._waiting += 1
+        self._max_waiting = max(self._max_waiting, self._waiting)
+        try:
+            if background:
+                await self._acquire_background()
+            else:
+                await self._acquire_interactive()
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - start
+        if background:
+            self._background_acquired += 1
+            return waited
+        self._acquired += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        return waited
+
+    async def _acquire_interactive(self) -> None:
+        self._interactive_waiting += 1
+        self._no_interactive.clear()
+        try:
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            self._interactive_waiting -= 1
+            self._last_interactive = time.monotonic()
+            if not self._interactive_waiting:
+                self._no_interactive.set()
+
+    async def _acquire_background(self) -> None:
+        while True:
+            await self._no_interactive.wait()
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                if self._interactive_waiting:
+                    # Leave the token for the interactive caller queued
+                    # behind us.
+                    continue
+                self._tokens -= 1
+                return
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def idle_for(self) -> float:
+        """Seconds since an interactive caller last held or waited for a token."""
+        if self._interactive_waiting:
+            return 0.0
+        return time.monotonic() - self._last_interactive
+
+    def stats(self) -> dict:
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'queue_depth': self._waiting,
+            'max_queue_depth': self._max_waiting,
+            'acquired': self._acquired,
+            'background_acquired': self._background_acquired,
+            'total_wait_seconds': round(self._total_wait, 3),
+            'mean_wait_seconds': round(self._total_wait / self._acquired, 3) if self._acquired else 0.0,
+            'max_wait_seconds': round(self._max_wait, 3),
+        }
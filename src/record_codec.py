@@ -0,0 +1,115 @@
+"""zlib compression of stored paper text, with dictionaries trained on abstracts."""
+
+import random
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+# zlib looks back at most 32 KiB, so a larger dictionary is never used.
+ZDICT_SIZE = 32 * 1024
+# Summaries a store needs before it trains a dictionary from them.
+TRAIN_MIN_SAMPLES = 200
+TRAIN_MAX_SAMPLES = 2000
+
+_FORMAT = 1
+# Format byte, then the ID of the dictionary the data was compressed with,
+# 0 for none. IDs are CRC-32s of the dictionaries, so processes training
+# their own never collide.
+_HEADER = struct.Struct("<BI")
+
+
+def zdict_id(zdict: bytes) -> int:
+    return zlib.crc32(zdict) or 1
+
+
+def train_zdict(samples: Iterable[str], size: int = ZDICT_SIZE) -> bytes:
+    """
+    Build a zlib preset dictionary from the phrases most common in `samples`.
+
+    Runs of one to four words are scored by how many bytes they would save
+    across the samples, and the best are packed into `size` bytes. The most
+    valuable go last, where matches against them are shortest to encode.
+    """
+    counts: Counter = Counter()
+    for text in samples:
+        words = text.split()
+        for n in (1, 2, 3, 4):
+            for i in range(len(words) - n + 1):
+                counts[" ".join(words[i:i + n])] += 1
+
+    scored = sorted(
+        ((count * len(phrase), phrase) for phrase, count in counts.items() if count > 1),
+        reverse=True,
+    )
+    picked: List[bytes] = []
+    total = 0
+    for _, phrase in scored:
+        data = f" {phrase}".encode()
+        if total + len(data) > size:
+            continue
+        picked.append(data)
+        total += len(data)
+    return b"".join(reversed(picked))
+
+
+def sample(texts: List[str], k: int = TRAIN_MAX_SAMPLES) -> List[str]:
+    return texts if len(texts) <= k else random.sample(texts, k)
+
+
+class Codec:
+    """
+    Compress text with raw deflate and the current preset dictionary.
+
+    Every compressed value names the dictionary it needs, so values written
+    with older dictionaries, or by other processes with their own, still
+    decode: unknown ones are fetched with `load_zdict` on first use.
+    """
+
+    def __init__(self, load_zdict: Callable[[int], Optional[bytes]], level: int = 9):
+        self.level = level
+        self._load_zdict = load_zdict
+        self._zdicts: Dict[int, bytes] = {}
+        self._current = 0
+        self._lock = threading.Lock()
+
+    @property
+    def trained(self) -> bool:
+        return self._current != 0
+
+    def use_zdict(self, zdict: bytes) -> int:
+        """Compress with `zdict` from now on and return its ID."""
+        dict_id = zdict_id(zdict)
+        with self._lock:
+            self._zdicts[dict_id] = zdict
+            self._current = dict_id
+        return dict_id
+
+    def _zdict(self, dict_id: int) -> bytes:
+        zdict = self._zdicts.get(dict_id)
+        if zdict is None:
+            zdict = self._load_zdict(dict_id)
+            if zdict is None:
+                raise ValueError(f"Unknown compression dictionary {dict_id:08x}")
+            with self._lock:
+                self._zdicts[dict_id] = zdict
+        return zdict
+
+    def compress(self, text: str) -> bytes:
+        dict_id = self._current
+        if dict_id:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=self._zdicts[dict_id])
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        return _HEADER.pack(_FORMAT, dict_id) + compressor.compress(text.encode()) + compressor.flush()
+
+    def decompress(self, data: bytes) -> str:
+        version, dict_id = _HEADER.unpack_from(data)
+        if version != _FORMAT:
+            raise ValueError(f"Unknown compression format {version}")
+        if dict_id:
+            decompressor = zlib.decompressobj(-15, zdict=self._zdict(dict_id))
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return (decompressor.decompress(data[_HEADER.size:]) + decompressor.flush()).decode()
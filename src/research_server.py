@@ -1,13 +1,188 @@
-import arxiv
+import asyncio
+import datetime
 import json
 import os
-from typing import List
-from mcp.server.fastmcp import FastMCP
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+from urllib.parse import unquote
+from mcp.server.fastmcp import Context, FastMCP
 import uvicorn
 
-PAPER_DIR = "papers"
+import config
+from arxiv_fetch import ArxivFetchError, ArxivFetcher, RequestClock, is_valid_arxiv_id
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from group_commit import GroupCommit
+from paper_snapshot import SnapshotManager
+from paper_store import ID_LOOKUP_TOPIC, FileStore, base_id, topic_dir_name
+from pdf_store import PdfStore
+from query_cache import QueryCache, query_key
+from rate_limit import TokenBucket
+from search_history import SearchHistory
+from singleflight import SingleFlight
+from sqlite_store import SqliteStore
+
+PAPER_DIR = config.PAPER_DIR
+# Papers listed by the papers://author/{name} and papers://recent resources.
+AUTHOR_RESOURCE_LIMIT = 100
+RECENT_RESOURCE_LIMIT = 50
+# Shortest wait before retrying a background refresh the circuit rejected.
+REVALIDATE_MIN_DELAY = 1.0
+
+
+@dataclass
+class AppState:
+    """Process-wide resources shared by every MCP session."""
+
+    store: Union[SqliteStore, FileStore]
+    writes: GroupCommit
+    limiter: TokenBucket
+    breaker: CircuitBreaker
+    fetcher: ArxivFetcher
+    cache: QueryCache
+    flights: SingleFlight
+    pdfs: PdfStore
+    history: SearchHistory
+    snapshot: Optional[SnapshotManager] = None
+    prefetcher: Optional[asyncio.Task] = None
+    compactor: Optional[asyncio.Task] = None
+    snapshotter: Optional[asyncio.Task] = None
+    # Searches waiting for arXiv to recover after serving stale results.
+    revalidating: Dict[str, asyncio.Task] = field(default_factory=dict)
+    # How long each interactive search has been waiting on arXiv, by flight key.
+    request_clocks: Dict[str, RequestClock] = field(default_factory=dict)
+
+    async def aclose(self) -> None:
+        # Workers finish any compaction, rebuild or save already running in
+        # a thread before they exit, so the store is idle once they have.
+        tasks = [
+            task for task in (self.prefetcher, self.compactor, self.snapshotter)
+            if task is not None
+        ]
+        tasks.extend(self.revalidating.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Searches still waiting on arXiv are dropped, but every page they
+        # already handed to the writer is stored before the store closes.
+        await self.flights.aclose()
+        await self.writes.aclose()
+        if self.snapshot is not None:
+            # Fold in this process's last writes, so the next start does
+            # not find the snapshot behind the store.
+            try:
+                await _in_thread(self.snapshot.rebuild)
+            except Exception as e:
+                print(f"Rebuilding the paper snapshot failed: {e!r}")
+        await self.fetcher.aclose()
+        await self.pdfs.aclose()
+        self.cache.close()
+        self.history.save()
+        self.store.close()
+
+
+_state: Optional[AppState] = None
+_state_users = 0
+_state_lock = asyncio.Lock()
+
+
+@asynccontextmanager
+async def shared_state() -> AsyncIterator[AppState]:
+    """
+    Hold a reference to the process-wide AppState, creating it on first use.
 
-mcp = FastMCP("research", host="0.0.0.0", port=int(os.getenv("PORT", "8001")))
+    FastMCP enters its lifespan once per session (every SSE connection runs
+    its own low-level server), so the state is reference counted and only
+    torn down when the last holder leaves.
+    """
+    global _state, _state_users
+    async with _state_lock:
+        if _state is None:
+            limiter = TokenBucket(config.ARXIV_RATE_LIMIT, config.ARXIV_RATE_BURST)
+            breaker = CircuitBreaker(
+                config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_TIMEOUT
+            )
+            cache = QueryCache(
+                config.QUERY_CACHE_PATH,
+                ttl=config.QUERY_CACHE_TTL,
+                l1_size=config.QUERY_CACHE_L1_SIZE,
+                l2_size=config.QUERY_CACHE_L2_SIZE,
+            )
+            store = open_paper_store()
+            snapshot = None
+            save = store.save_papers
+            if config.SNAPSHOT_INTERVAL > 0:
+                snapshot = SnapshotManager(config.SNAPSHOT_PATH, store)
+                save = snapshot.save_papers
+            _state = AppState(
+                store=store,
+                writes=GroupCommit(save, window=config.GROUP_COMMIT_WINDOW),
+                limiter=limiter,
+                breaker=breaker,
+                fetcher=ArxivFetcher(limiter, breaker),
+                cache=cache,
+                flights=SingleFlight(),
+                pdfs=PdfStore(
+                    config.PDF_DIR,
+                    max_bytes=config.PDF_STORE_MAX_BYTES,
+                    concurrency=config.PDF_CONCURRENCY,
+                ),
+                history=SearchHistory(config.SEARCH_HISTORY_PATH),
+                snapshot=snapshot,
+            )
+            if config.PREFETCH_TOPICS > 0:
+                _state.prefetcher = asyncio.create_task(_prefetch_worker(_state))
+            if isinstance(_state.store, FileStore):
+                _state.compactor = asyncio.create_task(_compact_worker(_state.store))
+            if snapshot is not None:
+                _state.snapshotter = asyncio.create_task(_snapshot_worker(snapshot))
+        _state_users += 1
+    try:
+        yield _state
+    finally:
+        async with _state_lock:
+            _state_users -= 1
+            if _state_users == 0:
+                await _state.aclose()
+                _state = None
+
+
+def open_paper_store() -> Union[SqliteStore, FileStore]:
+    """Open the paper store chosen by PAPER_STORE."""
+    if config.PAPER_COMPRESSION not in ("none", "zlib"):
+        raise ValueError(f"Unknown PAPER_COMPRESSION {config.PAPER_COMPRESSION!r}")
+    compress = config.PAPER_COMPRESSION == "zlib"
+    if config.PAPER_STORE == "files":
+        return FileStore(
+            PAPER_DIR,
+            compact_bytes=config.PAPER_LOG_COMPACT_BYTES,
+            compact_garbage=config.PAPER_LOG_COMPACT_GARBAGE,
+            cache_bytes=config.TOPIC_CACHE_MAX_BYTES,
+            compress=compress,
+        )
+    if config.PAPER_STORE != "sqlite":
+        raise ValueError(f"Unknown PAPER_STORE {config.PAPER_STORE!r}")
+    store = SqliteStore(config.PAPER_DB_PATH, compress=compress)
+    # Only read, so the files stay usable by a store running with
+    # PAPER_STORE=files; the database keeps its own indexes.
+    files = FileStore(PAPER_DIR, read_only=True)
+    store.import_files(files)
+    files.close()
+    return store
+
+
+def app_state() -> AppState:
+    if _state is None:
+        raise RuntimeError("The research server has not been started.")
+    return _state
+
+
+mcp = FastMCP(
+    "research",
+    host="0.0.0.0",
+    port=int(os.getenv("PORT", "8001")),
+    lifespan=lambda server: shared_state(),
+)
 
 @mcp.tool()
 def prompt_generate_search_prompt(topic: str, num_papers: int = 5) -> str:
@@ -20,61 +195,310 @@ def prompt_as_resource(topic: str, num_papers: int = 5) -> str:
 
 
 @mcp.tool()
-def search_papers(topic: str, max_results: int = 5) -> List[str]:
+async def search_papers(
+    topic: str, max_results: int = 5, idempotency_key: Optional[str] = None
+) -> Union[List[str], Dict[str, Any]]:
     """
     Search for papers on arXiv based on a topic and store their information.
+
+    If arXiv is down or too slow to answer, the papers already stored for
+    the topic are returned instead, marked as stale, and the search is
+    retried in the background.
     
     Args:
         topic: The topic to search for
         max_results: Maximum number of results to retrieve (default: 5)
+        idempotency_key: Optional client-chosen key; retries that reuse it
+            share the original search instead of starting a new one
         
     Returns:
-        List of paper IDs found in the search
+        List of paper IDs found in the search, or a dict with "paper_ids",
+        "stale" and "reason" when stored results were served instead
     """
-    client = arxiv.Client()
+    return await _search(app_state(), topic, max_results, idempotency_key)
 
-    search = arxiv.Search(
-        query=topic,
-        max_results=max_results,
-        sort_by=arxiv.SortCriterion.Relevance
-    )
+@mcp.tool()
+async def search_papers_batch(
+    topics: List[str], ctx: Context, max_results: int = 5
+) -> Dict[str, Union[List[str], Dict[str, Any], str]]:
+    """
+    Search arXiv for several topics at once and store the results per topic.
 
-    papers = client.results(search)
+    All topics are scheduled together through the shared arXiv rate limiter,
+    and each topic is saved as soon as its own search finishes.
 
-    path = os.path.join(PAPER_DIR, topic.lower().replace(" ", "_"))
-    os.makedirs(path, exist_ok=True)
+    Args:
+        topics: The topics to search for
+        max_results: Maximum number of results to retrieve per topic (default: 5)
 
-    file_path = os.path.join(path, "papers_info.json")
+    Returns:
+        Mapping of each topic to what search_papers would return for it, or
+        to an error message if that topic's search failed
+    """
+    state = app_state()
+    topics = list(dict.fromkeys(topics))
+
+    async def run(topic: str) -> tuple:
+        try:
+            result = await _search(state, topic, max_results)
+        except Exception as e:
+            result = f"Error searching for '{topic}': {e}"
+        return topic, result
+
+    results = {}
+    for done, next_result in enumerate(
+        asyncio.as_completed([run(topic) for topic in topics]), start=1
+    ):
+        topic, result = await next_result
+        results[topic] = result
+        await ctx.report_progress(done, len(topics), f"Finished '{topic}'")
+
+    return {topic: results[topic] for topic in topics}
+
+async def _search(
+    state: AppState,
+    topic: str,
+    max_results: int,
+    idempotency_key: Optional[str] = None,
+) -> Union[List[str], Dict[str, Any]]:
+    state.history.record(topic, max_results)
+    key = query_key(topic, max_results, "relevance")
+    # Shared by every caller that joins the flight, like the search itself.
+    clock = state.request_clocks.setdefault(key, RequestClock())
+    search = asyncio.ensure_future(state.flights.do(
+        key,
+        lambda: _search_and_store(state, topic, max_results, "relevance", clock=clock),
+        idempotency_key=idempotency_key,
+    ))
+    try:
+        # Only time spent waiting on arXiv counts towards the deadline, not
+        # time queued behind other requests in the rate limiter.
+        while not search.done():
+            waited = clock.waited()
+            if waited >= config.ARXIV_DEADLINE:
+                reason = f"arXiv did not answer within {config.ARXIV_DEADLINE:.0f}s"
+                stale = await _stale_results(state, topic, max_results, reason)
+                if stale is not None:
+                    # The shared fetch is shielded, so it carries on; when
+                    # it lands it refreshes the store and the cache.
+                    return stale
+                # Nothing to fall back on, so the search is worth waiting for.
+                return await search
+            await asyncio.wait({search}, timeout=config.ARXIV_DEADLINE - waited)
+        return search.result()
+    except CircuitOpenError as e:
+        reason = f"arXiv is unavailable; retrying in {e.retry_after:.0f}s"
+        _revalidate_later(state, topic, max_results, e.retry_after)
+        stale = await _stale_results(state, topic, max_results, reason)
+        if stale is None:
+            raise RuntimeError(f"{reason}, and nothing is stored for '{topic}' yet") from e
+        return stale
+    except ArxivFetchError as e:
+        stale = await _stale_results(state, topic, max_results, f"arXiv failed: {e}")
+        if stale is None:
+            raise
+        _revalidate_later(
+            state, topic, max_results, max(state.breaker.retry_after(), REVALIDATE_MIN_DELAY)
+        )
+        return stale
+    finally:
+        if not search.done():
+            search.cancel()
+        elif state.request_clocks.get(key) is clock:
+            # Joined a flight started without this clock, e.g. a background
+            # refresh, so nothing else will drop it.
+            del state.request_clocks[key]
+
+async def _stale_results(
+    state: AppState, topic: str, max_results: int, reason: str
+) -> Optional[Dict[str, Any]]:
+    """Return the stored results for a topic marked stale, or None if there are none."""
+    stored = await asyncio.to_thread(state.store.load_topic, topic)
+    if not stored:
+        return None
+    print(f"Serving stored results for '{topic}': {reason}")
+    return {
+        'paper_ids': list(stored)[:max_results],
+        'stale': True,
+        'reason': reason,
+    }
+
+async def _in_thread(fn: Callable[[], Any]) -> Any:
+    """
+    Run `fn` in a worker thread, as asyncio.to_thread does.
 
+    A thread cannot be interrupted, so if the caller is cancelled this
+    still waits for `fn` to return before the cancellation goes through.
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(fn))
     try:
-        with open(file_path, "r") as json_file:
-            papers_info = json.load(json_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        papers_info = {}
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait({task})
+        raise
+
+async def _prefetch_worker(state: AppState) -> None:
+    """
+    Keep the most popular and most recent searches warm in the query cache.
+
+    Runs for the life of the process. Whenever interactive traffic has been
+    quiet for a while, it re-runs top-ranked searches whose cached results
+    are about to expire, using background priority on the rate limiter so
+    that a user's search always goes first.
+    """
+    while True:
+        await asyncio.sleep(config.PREFETCH_INTERVAL)
+        await _in_thread(state.history.save)
+        for entry in state.history.top(config.PREFETCH_TOPICS):
+            if state.limiter.idle_for() < config.PREFETCH_IDLE_SECONDS:
+                break
+            if state.breaker.state != CircuitBreaker.CLOSED:
+                break
+            topic, max_results = entry['topic'], entry['max_results']
+            key = query_key(topic, max_results, "relevance")
+            if await state.cache.remaining_ttl(key) > config.PREFETCH_MARGIN:
+                continue
+            try:
+                # A separate flight key, so an interactive search for the
+                # same topic is not stuck behind background priority.
+                await state.flights.do(
+                    f"prefetch|{key}",
+                    lambda: _search_and_store(
+                        state, topic, max_results, "relevance",
+                        refresh=True, background=True,
+                    ),
+                )
+            except Exception as e:
+                print(f"Prefetch of '{topic}' failed: {e}")
+
+async def _compact_worker(store: FileStore) -> None:
+    """Rewrite the file store's record log once it is mostly garbage."""
+    while True:
+        await asyncio.sleep(config.PAPER_COMPACT_INTERVAL)
+        try:
+            await _in_thread(store.compact_pending)
+        except OSError as e:
+            print(f"Compacting paper logs failed: {e}")
+
+async def _snapshot_worker(snapshot: SnapshotManager) -> None:
+    """Build the paper snapshot, then fold recent writes into it."""
+    while True:
+        try:
+            await _in_thread(snapshot.rebuild)
+        except Exception as e:
+            # Reads fall back to the store meanwhile; try again next round.
+            print(f"Rebuilding the paper snapshot failed: {e!r}")
+        await asyncio.sleep(config.SNAPSHOT_INTERVAL)
+
+def _revalidate_later(state: AppState, topic: str, max_results: int, delay: float) -> None:
+    """Re-run a search once the circuit lets requests through again."""
+    key = query_key(topic, max_results, "relevance")
+    if key in state.revalidating:
+        return
+
+    async def revalidate():
+        try:
+            wait = delay
+            while True:
+                await asyncio.sleep(wait)
+                try:
+                    await state.flights.do(
+                        key, lambda: _search_and_store(state, topic, max_results, "relevance")
+                    )
+                    return
+                except CircuitOpenError as e:
+                    # Another search holds the half-open probe, or it failed
+                    # and the circuit reopened; try again when it allows.
+                    wait = max(e.retry_after, REVALIDATE_MIN_DELAY)
+        except Exception as e:
+            print(f"Background refresh of '{topic}' failed: {e}")
+        finally:
+            state.revalidating.pop(key, None)
+
+    state.revalidating[key] = asyncio.create_task(revalidate())
+
+@mcp.tool()
+async def refresh_topic(topic: str, max_results: int = 100) -> List[str]:
+    """
+    Fetch only the papers on a topic that are newer than the ones already stored.
+
+    Results are requested newest first and paging stops at the first paper
+    that is not newer than the topic's high-water mark, so refreshing a
+    topic with nothing new costs one small request.
+
+    Args:
+        topic: The topic to refresh
+        max_results: Maximum number of new papers to retrieve (default: 100)
+
+    Returns:
+        List of IDs of the newly stored papers
+    """
+    state = app_state()
+    return await state.flights.do(
+        f"refresh|{topic_dir_name(topic)}",
+        lambda: _refresh_topic(state, topic, max_results),
+    )
+
+async def _refresh_topic(state: AppState, topic: str, max_results: int) -> List[str]:
+    meta = await asyncio.to_thread(state.store.load_topic_meta, topic)
+    high_water = meta.get("high_water", {}).get("published", "")
 
     papers_ids = []
-    for paper in papers:
-        papers_ids.append(paper.get_short_id())
-        paper_info = {
-            'title': paper.title,
-            'authors': [author.name for author in paper.authors],
-            'summary': paper.summary,
-            'pdf_url': paper.pdf_url,
-            'published': str(paper.published.date())
-        }
-        papers_info[paper.get_short_id()] = paper_info
-
-    with open(file_path, "w") as json_file:
-        json.dump(papers_info, json_file, indent=2)
-
-    print(f"Results are saved in: {file_path}")
-    
+    pages = state.fetcher.pages(
+        topic,
+        max_results,
+        sort_by="submittedDate",
+        page_size=config.REFRESH_PAGE_SIZE,
+    )
+    async with aclosing(pages):
+        async for page in pages:
+            new_papers = [paper for paper in page if paper.published > high_water]
+            if new_papers:
+                await state.writes.save(topic, new_papers)
+                papers_ids.extend(paper.id for paper in new_papers)
+            if len(new_papers) < len(page):
+                # Reached papers we already hold.
+                break
+
+    return papers_ids
+
+async def _search_and_store(
+    state: AppState,
+    topic: str,
+    max_results: int,
+    sort_by: str,
+    refresh: bool = False,
+    background: bool = False,
+    clock: Optional[RequestClock] = None,
+) -> List[str]:
+    key = query_key(topic, max_results, sort_by)
+    try:
+        if not refresh:
+            cached = await state.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Persist page by page so large pulls never hold more than one page.
+        papers_ids = []
+        file_path = None
+        async for page in state.fetcher.pages(
+            topic, max_results, sort_by=sort_by, background=background, clock=clock
+        ):
+            file_path = await state.writes.save(topic, page)
+            papers_ids.extend(paper.id for paper in page)
+    finally:
+        if clock is not None and state.request_clocks.get(key) is clock:
+            del state.request_clocks[key]
+    if file_path is not None:
+        print(f"Results are saved in: {file_path}")
+
+    await state.cache.put(key, papers_ids)
     return papers_ids
 
 @mcp.tool()
 def extract_info(paper_id: str) -> str:
     """
-    Search for information about a specific paper across all topic directories.
+    Search for information about a specific paper across all topics.
     
     Args:
         paper_id: The ID of the paper to look for
@@ -83,22 +507,215 @@ def extract_info(paper_id: str) -> str:
         JSON string with paper information if found, error message if not found
     """
  
-    for item in os.listdir(PAPER_DIR):
-        item_path = os.path.join(PAPER_DIR, item)
-        if os.path.isdir(item_path):
-            file_path = os.path.join(item_path, "papers_info.json")
-            if os.path.isfile(file_path):
-                try:
-                    with open(file_path, "r") as json_file:
-                        papers_info = json.load(json_file)
-                        if paper_id in papers_info:
-                            return json.dumps(papers_info[paper_id], indent=2)
-                except (FileNotFoundError, json.JSONDecodeError) as e:
-                    print(f"Error reading {file_path}: {str(e)}")
-                    continue
+    state = app_state()
+    paper_info = state.snapshot.get_paper(paper_id) if state.snapshot else None
+    if paper_info is None:
+        paper_info = state.store.get_paper(paper_id)
+    if paper_info is not None:
+        return json.dumps(paper_info, indent=2)
     
     return f"There's no saved information related to paper {paper_id}."
 
+@mcp.tool()
+async def extract_info_batch(paper_ids: List[str]) -> str:
+    """
+    Get information about several papers at once.
+
+    Papers already stored under any topic are answered locally. All the
+    others are fetched from arXiv in a single ID lookup and stored, so the
+    next lookup for them is local too.
+
+    Args:
+        paper_ids: The IDs of the papers to look for, with or without version
+
+    Returns:
+        JSON string mapping each paper ID to its information, or to null if
+        arXiv has no such paper or could not be reached
+    """
+    paper_ids = list(dict.fromkeys(paper_ids))
+    found = await _lookup_papers(app_state(), paper_ids)
+    return json.dumps({pid: found.get(pid) for pid in paper_ids}, indent=2)
+
+async def _lookup_papers(state: AppState, paper_ids: List[str]) -> Dict[str, dict]:
+    """Find papers locally, fetching any misses from arXiv in one request."""
+    found = await asyncio.to_thread(state.store.find_papers, paper_ids)
+
+    missing = [pid for pid in paper_ids if pid not in found and is_valid_arxiv_id(pid)]
+    if missing:
+        try:
+            papers = await state.fetcher.fetch_ids(missing)
+        except (ArxivFetchError, CircuitOpenError) as e:
+            # Answer what the store has; the misses stay unknown.
+            print(f"Looking up {len(missing)} papers on arXiv failed: {e}")
+            return found
+        if papers:
+            await state.writes.save(ID_LOOKUP_TOPIC, papers)
+        by_id = {}
+        for paper in papers:
+            by_id[paper.id] = paper
+            by_id.setdefault(base_id(paper.id), paper)
+        for pid in missing:
+            paper = by_id.get(pid)
+            if paper is not None:
+                found[pid] = paper.to_info()
+
+    return found
+
+@mcp.tool()
+async def papers_by_author(name: str, limit: int = 20) -> str:
+    """
+    Find the stored papers by an author, without contacting arXiv.
+
+    Names match regardless of case, accents and punctuation, so "jose nunez"
+    finds papers by "José Núñez".
+
+    Args:
+        name: The author's full name
+        limit: Maximum number of papers to return (default: 20)
+
+    Returns:
+        JSON list of the author's papers, newest first
+    """
+    state = app_state()
+    paper_ids = await asyncio.to_thread(state.store.papers_by_author, name, limit)
+    found = await asyncio.to_thread(state.store.find_papers, paper_ids)
+    return json.dumps([
+        {'paper_id': pid, **found[pid]} for pid in paper_ids if pid in found
+    ], indent=2)
+
+@mcp.tool()
+async def papers_in_range(
+    start: str, end: str, topic: Optional[str] = None, limit: int = 100
+) -> str:
+    """
+    Find the stored papers published between two dates, without contacting arXiv.
+
+    Args:
+        start: First publication date to include, as YYYY-MM-DD
+        end: Last publication date to include, as YYYY-MM-DD
+        topic: Only return papers stored under this topic (default: any topic)
+        limit: Maximum number of papers to return (default: 100)
+
+    Returns:
+        JSON list of the papers in the range, newest first, or an error
+        message if a date is not valid
+    """
+    try:
+        first = datetime.date.fromisoformat(start)
+        after = datetime.date.fromisoformat(end) + datetime.timedelta(days=1)
+    except ValueError as e:
+        return f"Invalid date: {e}. Use YYYY-MM-DD."
+    state = app_state()
+    paper_ids = await asyncio.to_thread(
+        state.store.papers_by_date, first.isoformat(), after.isoformat(), topic, limit
+    )
+    found = await asyncio.to_thread(state.store.find_papers, paper_ids)
+    return json.dumps([
+        {'paper_id': pid, **found[pid]} for pid in paper_ids if pid in found
+    ], indent=2)
+
+@mcp.tool()
+async def local_search(query: str, limit: int = 10) -> str:
+    """
+    Search the papers already stored, without contacting arXiv.
+
+    Matches every word of the query against titles, summaries and author
+    names, and ranks the results by BM25 relevance.
+
+    Args:
+        query: The words to look for
+        limit: Maximum number of papers to return (default: 10)
+
+    Returns:
+        JSON list of the matching papers, best match first
+    """
+    state = app_state()
+    paper_ids = await asyncio.to_thread(state.store.search, query, limit)
+    found = await asyncio.to_thread(state.store.find_papers, paper_ids)
+    return json.dumps([
+        {'paper_id': pid, **found[pid]} for pid in paper_ids if pid in found
+    ], indent=2)
+
+@mcp.tool()
+async def fetch_papers_pdf(paper_ids: List[str]) -> Dict[str, str]:
+    """
+    Download the PDFs of several papers into the local PDF store.
+
+    PDFs are downloaded a few at a time and kept on disk, so any later
+    request for the same paper version is a local file read.
+
+    Args:
+        paper_ids: The IDs of the papers, with or without version
+
+    Returns:
+        Mapping of each paper ID to the local path of its PDF, or to an
+        error message if it could not be downloaded
+    """
+    state = app_state()
+    paper_ids = list(dict.fromkeys(paper_ids))
+
+    async def fetch(paper_id: str, version_id: str, url: str) -> tuple:
+        try:
+            return paper_id, await state.pdfs.fetch(version_id, url)
+        except Exception as e:
+            return paper_id, f"Error downloading PDF for {paper_id}: {e}"
+
+    results, downloads = {}, []
+    for paper_id, located in (await _locate_pdfs(state, paper_ids)).items():
+        if isinstance(located, str):
+            results[paper_id] = located
+        else:
+            downloads.append(fetch(paper_id, *located))
+    results.update(await asyncio.gather(*downloads))
+    return {paper_id: results[paper_id] for paper_id in paper_ids}
+
+@mcp.resource("papers://pdf/{paper_id}", mime_type="application/pdf")
+async def get_paper_pdf(paper_id: str) -> bytes:
+    """
+    Get the PDF of a paper, downloading it into the local PDF store if needed.
+
+    Args:
+        paper_id: The ID of the paper, with or without version
+    """
+    state = app_state()
+    located = (await _locate_pdfs(state, [paper_id]))[paper_id]
+    if isinstance(located, str):
+        raise ValueError(located)
+    path = await state.pdfs.fetch(*located)
+    return await asyncio.to_thread(_read_bytes, path)
+
+async def _locate_pdfs(state: AppState, paper_ids: List[str]) -> Dict[str, Union[tuple, str]]:
+    """
+    Map each ID to (versioned ID, PDF URL), or to an error message.
+
+    IDs that already carry a version need no lookup; the others take the
+    version from the stored or freshly fetched record's PDF link.
+    """
+    located = {}
+    unversioned = []
+    for paper_id in paper_ids:
+        if not is_valid_arxiv_id(paper_id):
+            located[paper_id] = f"{paper_id} is not a valid arXiv ID."
+        elif base_id(paper_id) != paper_id:
+            located[paper_id] = (paper_id, f"https://arxiv.org/pdf/{paper_id}")
+        else:
+            unversioned.append(paper_id)
+
+    if unversioned:
+        found = await _lookup_papers(state, unversioned)
+        for paper_id in unversioned:
+            pdf_url = (found.get(paper_id) or {}).get('pdf_url')
+            version_id = pdf_url.split("/pdf/", 1)[-1] if pdf_url else None
+            if version_id and is_valid_arxiv_id(version_id) and base_id(version_id) != version_id:
+                located[paper_id] = (version_id, pdf_url)
+            else:
+                located[paper_id] = f"There's no PDF link for paper {paper_id}."
+    return located
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
 @mcp.resource("papers://folders")
 def get_available_folders() -> str:
     """
@@ -106,16 +723,8 @@ def get_available_folders() -> str:
     
     This resource provides a simple list of all available topic folders.
     """
-    folders = []
-
-    #Get all topic directories
-    if os.path.exists(PAPER_DIR):
-        for topic_dir in os.listdir(PAPER_DIR):
-            topic_path = os.path.join(PAPER_DIR, topic_dir)
-            if os.path.isdir(topic_path):
-                papers_file = os.path.join(topic_path, "papers_info.json")
-                if os.path.exists(papers_file):
-                    folders.append(topic_dir)
+    #Get all topics that hold papers
+    folders = app_state().store.topics()
     
     content = "# Available Topics\n\n"
     if folders:
@@ -135,35 +744,103 @@ def get_topic_papers(topic: str) -> str:
     Args:
         topic: The research topic to retrieve papers for
     """
-    topic_dir = topic.lower().replace(" ", "_")
-    papers_file = os.path.join(PAPER_DIR, topic_dir, "papers_info.json")
+    state = app_state()
+    # The snapshot yields one record at a time straight from the mapping.
+    view = state.snapshot.topic_papers(topic) if state.snapshot else None
+    if view is None:
+        papers_data = state.store.load_topic(topic)
+        if papers_data is not None:
+            view = (len(papers_data), iter(papers_data.items()))
     
-    if not os.path.exists(papers_file):
+    if view is None:
         return f"# No papers found for topic: {topic}\n\nTry searching for papers on this topic first."
     
     try:
-        with open(papers_file, 'r') as f:
-            papers_data = json.load(f)
-
-        if not isinstance(papers_data, dict):
-            return f"# Error reading papers data for {topic}\n\nThe papers data file is corrupted or malformed. Expected a dictionary but got a list."
-        
         # Create markdown content with paper details
+        total, papers = view
         content = f"# Papers on {topic.replace('_', ' ').title()}\n\n"
-        content += f"Total papers: {len(papers_data)}\n\n"
+        content += f"Total papers: {total}\n\n"
         
-        for paper_id, paper_info in papers_data.items():
-            content += f"## {paper_info['title']}\n"
-            content += f"- **Paper ID**: {paper_id}\n"
-            content += f"- **Authors**: {', '.join(paper_info['authors'])}\n"
-            content += f"- **Published**: {paper_info['published']}\n"
-            content += f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n\n"
-            content += f"### Summary\n{paper_info['summary'][:500]}...\n\n"
-            content += "---\n\n"
+        for paper_id, paper_info in papers:
+            content += _paper_markdown(paper_id, paper_info)
         
         return content
-    except json.JSONDecodeError:
-        return f"# Error reading papers data for {topic}\n\nThe papers data file is corrupted."
+    except (KeyError, TypeError):
+        return f"# Error reading papers data for {topic}\n\nThe papers data is corrupted or malformed."
+
+def _paper_markdown(paper_id: str, paper_info: dict) -> str:
+    content = f"## {paper_info['title']}\n"
+    content += f"- **Paper ID**: {paper_id}\n"
+    content += f"- **Authors**: {', '.join(paper_info['authors'])}\n"
+    content += f"- **Published**: {paper_info['published']}\n"
+    if paper_info['pdf_url']:
+        content += f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n"
+    content += "\n"
+    content += f"### Summary\n{paper_info['summary'][:500]}...\n\n"
+    content += "---\n\n"
+    return content
+
+@mcp.resource("papers://recent")
+def get_recent_papers() -> str:
+    """Get the most recently published papers across every topic."""
+    store = app_state().store
+    paper_ids = store.papers_by_date(None, None, limit=RECENT_RESOURCE_LIMIT)
+    found = store.find_papers(paper_ids)
+    if not found:
+        return "# No papers stored yet\n\nTry searching for papers on a topic first."
+
+    content = "# Recently Published Papers\n\n"
+    content += f"Total papers: {len(found)}\n\n"
+    for paper_id in paper_ids:
+        if paper_id in found:
+            content += _paper_markdown(paper_id, found[paper_id])
+    return content
+
+@mcp.resource("papers://author/{name}")
+def get_author_papers(name: str) -> str:
+    """
+    Get the stored papers by an author, newest first.
+
+    Args:
+        name: The author's name; case and accents are ignored
+    """
+    # Template parameters arrive as they appear in the URI, so a name with
+    # spaces or accents is still percent-encoded here.
+    name = unquote(name)
+    store = app_state().store
+    paper_ids = store.papers_by_author(name, AUTHOR_RESOURCE_LIMIT)
+    found = store.find_papers(paper_ids)
+    if not found:
+        return f"# No papers found by author: {name}\n\nPapers are indexed by author once they are stored."
+
+    content = f"# Papers by {name}\n\n"
+    content += f"Total papers: {len(found)}\n\n"
+    for paper_id in paper_ids:
+        if paper_id in found:
+            content += _paper_markdown(paper_id, found[paper_id])
+    return content
+
+@mcp.resource("metrics://server")
+def get_metrics() -> str:
+    """
+    Report runtime metrics for the research server as JSON.
+
+    Includes the queue depth and wait times of the shared arXiv rate limiter
+    and the hit, miss and eviction counters of the query cache.
+    """
+    state = app_state()
+    return json.dumps({
+        'arxiv_rate_limiter': state.limiter.stats(),
+        'arxiv_circuit_breaker': state.breaker.stats(),
+        'background_refreshes': len(state.revalidating),
+        'search_history_entries': len(state.history),
+        'query_cache': state.cache.stats(),
+        'pdf_store': state.pdfs.stats(),
+        'paper_store': state.store.stats(),
+        'paper_writes': state.writes.stats(),
+        'paper_snapshot': state.snapshot.stats() if state.snapshot else None,
+        'search_flights': state.flights.stats(),
+    }, indent=2)
 
 @mcp.prompt()
 def generate_search_prompt(topic: str, num_papers: int = 5) -> str:
@@ -191,9 +868,15 @@ def generate_search_prompt(topic: str, num_papers: int = 5) -> str:
     Please present both detailed information about each paper and a high-level synthesis of the research landscape in {topic}."""
 
 
+async def main():
+    # Keep the shared state alive between SSE sessions.
+    async with shared_state():
+        await mcp.run_sse_async()
+
+
 if __name__ == "__main__":
     # Initialize and run the server
-    mcp.run(transport='sse')
+    asyncio.run(main())
 
 # if __name__ == "__main__":
 #     # Initialize and run the server
@@ -0,0 +1,66 @@
+import json
+import os
+import time
+from typing import List, Optional
+
+from paper_store import normalize_topic
+
+
+class SearchHistory:
+    """
+    Lightweight record of which searches users run, for prefetching.
+
+    Each (topic, max_results) pair keeps a use count and the time it was
+    last used. Entries are ranked by count decayed with a half-life, so a
+    topic searched every morning stays near the top while one that was
+    popular last month sinks. The history is saved as JSON and trimmed to
+    `max_entries` on save.
+    """
+
+    def __init__(self, path: str, half_life: float = 3 * 86400, max_entries: int = 1000):
+        self.path = path
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self._entries = {}
+        self._dirty = False
+        try:
+            with open(path, "r") as json_file:
+                for entry in json.load(json_file):
+                    self._entries[(entry['topic'], entry['max_results'])] = entry
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def record(self, topic: str, max_results: int) -> None:
+        topic = normalize_topic(topic)
+        entry = self._entries.setdefault(
+            (topic, max_results),
+            {'topic': topic, 'max_results': max_results, 'count': 0, 'last_used': 0.0},
+        )
+        entry['count'] += 1
+        entry['last_used'] = time.time()
+        self._dirty = True
+
+    def top(self, limit: int, now: Optional[float] = None) -> List[dict]:
+        """Return the `limit` highest-ranked searches, best first."""
+        now = time.time() if now is None else now
+        return sorted(self._entries.values(), key=lambda e: self._score(e, now), reverse=True)[:limit]
+
+    def _score(self, entry: dict, now: float) -> float:
+        return entry['count'] * 0.5 ** ((now - entry['last_used']) / self.half_life)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        entries = self.top(self.max_entries)
+        self._entries = {(e['topic'], e['max_results']): e for e in entries}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as json_file:
+            json.dump(entries, json_file)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key onto one running coroutine.
+
+    The first caller for a key starts `fn()` as its own task and every
+    caller that arrives while it runs awaits the same task. Callers are
+    shielded from each other: one of them being cancelled does not cancel
+    the work the others are waiting for.
+
+    A caller may also pass an idempotency key. A retry carrying the same
+    idempotency key joins the original task, or gets its result if the
+    task finished successfully less than `idempotency_ttl` seconds ago.
+    """
+
+    def __init__(self, idempotency_ttl: float = 600.0):
+        self.idempotency_ttl = idempotency_ttl
+        self._flights: Dict[str, asyncio.Task] = {}
+        self._idempotent: Dict[str, Tuple[asyncio.Task, float]] = {}
+        self._started = 0
+        self._coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        idempotency_key: Optional[str] = None,
+    ) -> T:
+        task = None
+        if idempotency_key is not None:
+            task = self._replay(idempotency_key)
+        if task is None:
+            task = self._flights.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self._started += 1
+        else:
+            self._coalesced += 1
+
+        if idempotency_key is not None:
+            self._idempotent[idempotency_key] = (task, time.monotonic() + self.idempotency_ttl)
+        return await asyncio.shield(task)
+
+    def _replay(self, idempotency_key: str) -> Optional[asyncio.Task]:
+        now = time.monotonic()
+        for stale in [k for k, (_, expires) in self._idempotent.items() if expires <= now]:
+            del self._idempotent[stale]
+
+        entry = self._idempotent.get(idempotency_key)
+        if entry is None:
+            return None
+        task = entry[0]
+        if task.done() and (task.cancelled() or task.exception() is not None):
+            # Failures are not replayed; the retry gets a fresh attempt.
+            del self._idempotent[idempotency_key]
+            return None
+        return task
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away.
+            task.exception()
+
+    async def aclose(self) -> None:
+        """Cancel every running flight and wait for it to unwind."""
+        tasks = list(self._flights.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': len(self._flights),
+            'started': self._started,
+            'coalesced': self._coalesced,
+            'idempotency_keys': len(self._idempotent),
+        }
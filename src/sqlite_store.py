@@ -0,0 +1,441 @@
+"""SQLite-backed storage for paper records, shared by every topic."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+from arxiv_atom import Paper
+from paper_index import (
+    INDEX_SCHEMA,
+    index_current,
+    index_papers,
+    mark_index_current,
+    papers_by_author,
+    papers_by_date,
+    search,
+)
+from paper_store import ID_LOOKUP_TOPIC, FileStore, base_id, topic_dir_name, upgrade_topic_name
+from record_codec import TRAIN_MIN_SAMPLES, TRAIN_MAX_SAMPLES, Codec, train_zdict, zdict_id
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id TEXT PRIMARY KEY,
+    base_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    pdf_url TEXT NOT NULL,  -- '' when arXiv gave no PDF link
+    published TEXT NOT NULL,
+    updated TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS papers_base_id ON papers (base_id);
+CREATE INDEX IF NOT EXISTS papers_published ON papers (published);
+
+CREATE TABLE IF NOT EXISTS topics (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    high_water_published TEXT NOT NULL DEFAULT '',
+    high_water_updated TEXT NOT NULL DEFAULT ''
+);
+
+-- Rowids keep each topic's papers in the order they were first stored.
+CREATE TABLE IF NOT EXISTS topic_papers (
+    topic_id INTEGER NOT NULL REFERENCES topics (id),
+    paper_id TEXT NOT NULL REFERENCES papers (id),
+    UNIQUE (topic_id, paper_id)
+);
+CREATE INDEX IF NOT EXISTS topic_papers_paper ON topic_papers (paper_id);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+-- Compression dictionaries; store_meta's 'zdict' names the current one.
+CREATE TABLE IF NOT EXISTS zdicts (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+_PAPER_COLUMNS = "id, title, authors, summary, pdf_url, published"
+
+# Stay well below SQLite's limit on bound parameters per statement.
+_MAX_PARAMS = 500
+
+
+class SqliteStore:
+    """
+    Paper records in one SQLite database in WAL mode.
+
+    Papers are stored once and linked to the topics whose searches returned
+    them, so a write touches only the rows it changes, and a lookup by ID is
+    an index probe rather than a scan over topic files. Writes go through a
+    single connection under a lock; each reading thread gets its own
+    connection, which WAL lets proceed alongside a writer. The full-text
+    index lives in the same database and is updated in the same
+    transaction as the papers it covers.
+
+    With `compress` set, summaries are stored as deflated blobs, with a
+    dictionary trained on the stored summaries once there are enough of
+    them. Reads decode text and blobs alike, so the option can be switched
+    at any time.
+    """
+
+    def __init__(self, path: str, compress: bool = False):
+        self.path = path
+        self.compress = compress
+        self._codec = Codec(self._load_zdict)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        with self._write_lock:
+            self._writer.executescript(SCHEMA + INDEX_SCHEMA)
+            row = self._writer.execute(
+                "SELECT z.data FROM store_meta m JOIN zdicts z ON z.id = CAST(m.value AS INTEGER)"
+                " WHERE m.key = 'zdict'"
+            ).fetchone()
+            if row is not None:
+                self._codec.use_zdict(row[0])
+            with self._writer as db:
+                self._index_unindexed(db)
+
+    def _record(self, row: tuple) -> dict:
+        """Turn a papers row into the record format the tools return."""
+        _, title, authors, summary, pdf_url, published = row
+        if isinstance(summary, bytes):
+            summary = self._codec.decompress(summary)
+        return {
+            'title': title,
+            'authors': json.loads(authors),
+            'summary': summary,
+            'pdf_url': pdf_url or None,
+            'published': published[:10],
+        }
+
+    def _pack_summary(self, summary: str):
+        return self._codec.compress(summary) if self.compress else summary
+
+    def _load_zdict(self, dict_id: int) -> Optional[bytes]:
+        row = self._reader().execute("SELECT data FROM zdicts WHERE id = ?", (dict_id,)).fetchone()
+        return row[0] if row else None
+
+    def _train_zdict(self, incoming: List[Paper]) -> None:
+        """
+        Train the compression dictionary once enough summaries are stored.
+
+        The dictionary is committed in its own transaction before the codec
+        switches to it, so no row is ever written with a dictionary that a
+        rolled-back save could lose. Callers hold the write lock.
+        """
+        db = self._writer
+        stored = db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+        if stored + len(incoming) < TRAIN_MIN_SAMPLES:
+            return
+        rows = db.execute(
+            "SELECT summary FROM papers ORDER BY random() LIMIT ?", (TRAIN_MAX_SAMPLES,)
+        ).fetchall()
+        summaries = [
+            self._codec.decompress(row[0]) if isinstance(row[0], bytes) else row[0]
+            for row in rows
+        ]
+        summaries.extend(paper.summary for paper in incoming)
+        zdict = train_zdict(summaries)
+        dict_id = zdict_id(zdict)
+        with db:
+            db.execute("INSERT OR IGNORE INTO zdicts (id, data) VALUES (?, ?)", (dict_id, zdict))
+            db.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('zdict', ?)", (str(dict_id),)
+            )
+        self._codec.use_zdict(zdict)
+        logger.info("Trained a %d-byte compression dictionary on %d summaries", len(zdict), len(summaries))
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # WAL commits survive process crashes at NORMAL; only an OS crash
+        # can lose the most recent ones.
+        db.execute("PRAGMA synchronous=NORMAL")
+        with self._connections_lock:
+            self._connections.append(db)
+        return db
+
+    def _reader(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def save_papers(self, topic: str, papers: Iterable[Paper]) -> str:
+        """Merge papers into the topic and return where they were stored."""
+        name = topic_dir_name(topic)
+        papers = list(papers)
+        with self._write_lock:
+            if self.compress and not self._codec.trained:
+                self._train_zdict(papers)
+            with self._writer as db:
+                topic_id = self._topic_id(db, name)
+                db.executemany(
+                    "INSERT INTO papers"
+                    " (id, base_id, title, authors, summary, pdf_url, published, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (id) DO UPDATE SET"
+                    " title = excluded.title, authors = excluded.authors,"
+                    " summary = excluded.summary, pdf_url = excluded.pdf_url,"
+                    " published = excluded.published, updated = excluded.updated",
+                    [
+                        (
+                            paper.id, base_id(paper.id), paper.title,
+                            json.dumps(paper.authors), self._pack_summary(paper.summary), paper.pdf_url or '',
+                            paper.published, paper.updated,
+                        )
+                        for paper in papers
+                    ],
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO topic_papers (topic_id, paper_id) VALUES (?, ?)",
+                    [(topic_id, paper.id) for paper in papers],
+                )
+                index_papers(db, ((paper.id, paper.to_info()) for paper in papers))
+                self._count_change(db)
+                if papers:
+                    # arXiv timestamps are ISO 8601 in UTC, so they compare as strings.
+                    db.execute(
+                        "UPDATE topics SET"
+                        " high_water_published = max(high_water_published, ?),"
+                        " high_water_updated = max(high_water_updated, ?)"
+                        " WHERE id = ?",
+                        (
+                            max(paper.published for paper in papers),
+                            max(paper.updated for paper in papers),
+                            topic_id,
+                        ),
+                    )
+        return f"{self.path} [{name}]"
+
+    def _index_unindexed(self, db: sqlite3.Connection) -> None:
+        """Index the papers stored before the index was, or by an import."""
+        if index_current(db):
+            rows = db.execute(
+                f"SELECT {_PAPER_COLUMNS} FROM papers"
+                " WHERE id NOT IN (SELECT paper_id FROM search_docs)"
+            ).fetchall()
+        else:
+            rows = db.execute(f"SELECT {_PAPER_COLUMNS} FROM papers").fetchall()
+        index_papers(db, ((row[0], self._record(row)) for row in rows))
+        mark_index_current(db)
+
+    @staticmethod
+    def _count_change(db: sqlite3.Connection) -> None:
+        db.execute(
+            "INSERT INTO store_meta (key, value) VALUES ('changes', '1')"
+            " ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def change_marker(self) -> str:
+        """Return a value that changes whenever papers or topics are saved."""
+        row = self._reader().execute(
+            "SELECT value FROM store_meta WHERE key = 'changes'"
+        ).fetchone()
+        return row[0] if row else "0"
+
+    @staticmethod
+    def _topic_id(db: sqlite3.Connection, name: str) -> int:
+        db.execute("INSERT OR IGNORE INTO topics (name) VALUES (?)", (name,))
+        return db.execute("SELECT id FROM topics WHERE name = ?", (name,)).fetchone()[0]
+
+    def load_topic(self, topic: str) -> Optional[Dict[str, dict]]:
+        """Return the topic's stored papers keyed by ID, or None if it has none."""
+        rows = self._reader().execute(
+            "SELECT p.id, p.title, p.authors, p.summary, p.pdf_url, p.published"
+            " FROM topics t"
+            " JOIN topic_papers tp ON tp.topic_id = t.id"
+            " JOIN papers p ON p.id = tp.paper_id"
+            " WHERE t.name = ? ORDER BY tp.rowid",
+            (topic_dir_name(topic),),
+        ).fetchall()
+        if not rows:
+            return None
+        return {row[0]: self._record(row) for row in rows}
+
+    def load_topic_meta(self, topic: str) -> dict:
+        """Return the topic's bookkeeping, such as its high-water marks."""
+        row = self._reader().execute(
+            "SELECT high_water_published, high_water_updated FROM topics WHERE name = ?",
+            (topic_dir_name(topic),),
+        ).fetchone()
+        if row is None or not any(row):
+            return {}
+        return {"high_water": {"published": row[0], "updated": row[1]}}
+
+    def topics(self) -> List[str]:
+        """Return the names of the searched topics that hold papers."""
+        rows = self._reader().execute(
+            "SELECT name FROM topics"
+            " WHERE EXISTS (SELECT 1 FROM topic_papers WHERE topic_id = topics.id)"
+            " AND name != ? ORDER BY name",
+            (ID_LOOKUP_TOPIC,),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        """Return the record stored under exactly `paper_id`, or None."""
+        row = self._reader().execute(
+            f"SELECT {_PAPER_COLUMNS} FROM papers WHERE id = ?", (paper_id,)
+        ).fetchone()
+        return self._record(row) if row else None
+
+    def find_papers(self, paper_ids: List[str]) -> Dict[str, dict]:
+        """
+        Look up several papers by ID.
+
+        An ID without a version also matches the most recently stored version
+        of that paper; an ID with one matches only that version. Returns the
+        records found, keyed by the requested ID.
+        """
+        requested = list(dict.fromkeys(paper_ids))
+        unversioned = [paper_id for paper_id in requested if base_id(paper_id) == paper_id]
+        rows = []
+        db = self._reader()
+        for i in range(0, len(requested), _MAX_PARAMS):
+            chunk = requested[i:i + _MAX_PARAMS]
+            marks = ", ".join("?" * len(chunk))
+            rows.extend(db.execute(
+                f"SELECT {_PAPER_COLUMNS}, base_id, rowid FROM papers WHERE id IN ({marks})",
+                chunk,
+            ).fetchall())
+        for i in range(0, len(unversioned), _MAX_PARAMS):
+            chunk = unversioned[i:i + _MAX_PARAMS]
+            marks = ", ".join("?" * len(chunk))
+            rows.extend(db.execute(
+                f"SELECT {_PAPER_COLUMNS}, base_id, rowid FROM papers WHERE base_id IN ({marks})",
+                chunk,
+            ).fetchall())
+
+        wanted = set(requested)
+        found = {}
+        # Exact matches first, then the latest stored version for each base.
+        for row in sorted(rows, key=lambda row: (row[0] not in wanted, -row[-1])):
+            paper_id, paper_base = row[0], row[-2]
+            if paper_id in wanted and paper_id not in found:
+                found[paper_id] = self._record(row[:-2])
+            elif paper_base in wanted and paper_base not in found:
+                found[paper_base] = self._record(row[:-2])
+        return found
+
+    def search(self, query: str, limit: int) -> List[str]:
+        """Return the IDs of the stored papers matching `query`, best match first."""
+        return search(self._reader(), query, limit)
+
+    def papers_by_author(self, name: str, limit: int) -> List[str]:
+        """Return the IDs of the stored papers by `name`, newest first."""
+        return papers_by_author(self._reader(), name, limit)
+
+    def papers_by_date(
+        self,
+        start: Optional[str],
+        end: Optional[str],
+        topic: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[str]:
+        """Return the IDs of the stored papers published in [start, end), newest first."""
+        if limit <= 0:
+            return []
+        db = self._reader()
+        if topic is None:
+            return list(islice(papers_by_date(db, start, end), limit))
+        clauses, params = ["t.name = ?"], [topic_dir_name(topic)]
+        if start is not None:
+            clauses.append("d.published >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("d.published < ?")
+            params.append(end)
+        rows = db.execute(
+            "SELECT d.paper_id FROM topics t"
+            " JOIN topic_papers tp ON tp.topic_id = t.id"
+            " JOIN paper_dates d ON d.paper_id = tp.paper_id"
+            f" WHERE {' AND '.join(clauses)}"
+            " ORDER BY d.published DESC, d.paper_id DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def import_files(self, files: FileStore) -> int:
+        """
+        Copy every topic from a file store into the database, once.
+
+        Topics are read in whatever layout they are in and the files are
+        left untouched; open `files` read-only. The import is recorded in
+        the database, so later calls return 0 without reading the files
+        again. Returns the number of topics copied.
+        """
+        marker = f"imported:{os.path.abspath(files.root)}"
+        with self._write_lock, self._writer as db:
+            if db.execute("SELECT 1 FROM store_meta WHERE key = ?", (marker,)).fetchone():
+                return 0
+            imported = 0
+            for name, papers_info, meta in files.read_topics():
+                # Directories named by an earlier layout that now map to the
+                # same topic are merged into it.
+                topic_id = self._topic_id(db, upgrade_topic_name(name))
+                db.executemany(
+                    "INSERT OR IGNORE INTO papers"
+                    " (id, base_id, title, authors, summary, pdf_url, published)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            paper_id, base_id(paper_id), info['title'],
+                            json.dumps(info['authors']), self._pack_summary(info['summary']),
+                            info['pdf_url'] or '', info['published'],
+                        )
+                        for paper_id, info in papers_info.items()
+                    ],
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO topic_papers (topic_id, paper_id) VALUES (?, ?)",
+                    [(topic_id, paper_id) for paper_id in papers_info],
+                )
+                high_water = meta.get("high_water", {})
+                db.execute(
+                    "UPDATE topics SET"
+                    " high_water_published = max(high_water_published, ?),"
+                    " high_water_updated = max(high_water_updated, ?)"
+                    " WHERE id = ?",
+                    (high_water.get("published", ""), high_water.get("updated", ""), topic_id),
+                )
+                imported += 1
+            self._index_unindexed(db)
+            self._count_change(db)
+            db.execute("INSERT INTO store_meta (key, value) VALUES (?, ?)", (marker, str(imported)))
+        if imported:
+            logger.info("Imported %d topics from %s into %s", imported, files.root, self.path)
+        return imported
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for db in self._connections:
+                db.close()
+            self._connections.clear()
+
+    def stats(self) -> dict:
+        db = self._reader()
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'papers': db.execute("SELECT COUNT(*) FROM papers").fetchone()[0],
+            'topics': db.execute("SELECT COUNT(*) FROM topics").fetchone()[0],
+            'bytes': os.path.getsize(self.path),
+            'compressed': self.compress,
+        }
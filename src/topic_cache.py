@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TopicCache:
+    """
+    Process-wide LRU of parsed topic data, bounded by total bytes.
+
+    Every entry carries the signature of the files it was parsed from, such
+    as their `os.stat` size and mtime. A lookup with a different signature
+    is a miss, so edits made behind the store's back are picked up on the
+    next read. Cached values are shared between callers and must be treated
+    as read-only; writers replace them with `put` instead of mutating them.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str, signature: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: str, signature: Hashable, value: Any, size: int) -> None:
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (signature, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._evictions += 1
+
+    def peek(self, key: str, signature: Hashable) -> Optional[Any]:
+        """Like `get`, but neither counted nor marked as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                return None
+            return entry[1]
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+        }